@@ -8,23 +8,33 @@ so shout out to him and his library.
 
 """
 
+from abc import ABC, abstractmethod
 from contextlib import contextmanager
 from shutil import get_terminal_size
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache, wraps
+from itertools import groupby
 from pathlib import Path
 import string as stdstr
-from io import StringIO
+from io import StringIO, UnsupportedOperation
+from collections import deque
+from collections.abc import MutableSequence, Sequence
+from array import array
+from bisect import bisect_right
 from os import system
 import re
 import os
-import textwrap
 import sys
 import threading
+import weakref
+import atexit
+import mmap
+import signal
 import time
-from types import TracebackType
+from types import FunctionType, TracebackType
 from typing import (
+    Any,
     Callable,
     Generator,
     Iterable,
@@ -34,18 +44,19 @@ from typing import (
     ParamSpec,
     Protocol,
     TextIO,
+    TYPE_CHECKING,
     runtime_checkable,
     cast,
 )
-from pprint import pformat
 from ansi.colour.rgb import rgb256
 from ansi.colour import fx, bg, fg
-from pygments.lexer import Lexer
-from pygments.lexers import get_lexer_by_name
-from pygments.formatters.terminal256 import Terminal256Formatter
-from pygments.style import Style as CodeStyle
-from pygments import highlight as CodeHighlight
-from PIL import Image
+
+# pygments, PIL, pprint and textwrap are imported where they are used, so
+# that `import neon` stays cheap for programs that never need them
+if TYPE_CHECKING:
+    from pygments.lexer import Lexer, LexerContext
+    from pygments.formatters.terminal256 import Terminal256Formatter
+    from pygments.style import Style as CodeStyle
 
 
 @runtime_checkable
@@ -62,6 +73,15 @@ class SupportAutoRepr(Protocol):
     def __neon__(self) -> Generator[SupportsStr, SupportsStr | None, None]: ...
 
 
+@runtime_checkable
+class SupportsWrite(Protocol):
+    def write(self, data: str, /) -> object: ...
+
+
+class SupportsNeonWrite(Protocol):
+    def __neon_write__(self, sink: SupportsWrite) -> None: ...
+
+
 class SupportsStrAndAutoRepr(SupportsStr, SupportAutoRepr, Protocol):
     pass
 
@@ -174,6 +194,13 @@ def merge(string: tuple[SupportsStr, SupportsStr]) -> str:
 def flip(axis: Literal["x", "y"], string: SupportsStr) -> str:
     "flip the string according to the set axis"
     string = str(string)
+    if "\x1b" in string:
+        lines = StyledText(string).lines()
+        if axis == "y":
+            lines.reverse()
+        elif axis == "x":
+            lines = [line.reverse() for line in lines]
+        return "\n".join(map(str, lines))
     if axis == "y":
         lines = string.splitlines()
         lines.reverse()
@@ -196,6 +223,13 @@ def cut(
 ) -> "tuple[Segment, Segment, Segment]":
     "cut the string from the `position[0]` to `position[1]` and return the three section start, cutted string, end"
     string = str(string)
+    if "\x1b" in string or not string.isascii():
+        text = StyledText(string)
+        return (
+            Segment(text[: position[0]]),
+            Segment(text[position[0] : position[1]]),
+            Segment(text[position[1] :]),
+        )
     start = string[: position[0]]
     cutted = string[position[0] : position[1]]
     end = string[position[1] :]
@@ -204,17 +238,24 @@ def cut(
 
 def constrain(content: SupportsStr, width: int, *, reverse: bool = False) -> str:
     """Constrains the content to the specified width."""
-    if len(str(content)) < width:
-        return str(content)
+    content = str(content)
+    if "\x1b" in content or not content.isascii():
+        text = StyledText(content)
+        return str(text[max(len(text) - width, 0) :] if reverse else text[:width])
+    if len(content) < width:
+        return content
     if not reverse:
-        return str(content)[:width]
+        return content[:width]
     else:
-        return str(content)[-width:]
+        return content[max(len(content) - width, 0) :]
 
 
 def crop(content: SupportsStr, size: tuple[int, int]) -> str:
     "crop the string to the desired size"
     content = str(content)
+    if "\x1b" in content or not content.isascii():
+        lines = StyledText(content).lines()[: size[1]]
+        return "".join(f"{line[: size[0]]}\n" for line in lines)
     result = ""
     lines = content.splitlines()
     for index in range(min(len(lines), size[1])):
@@ -252,7 +293,12 @@ def trim(string: SupportsStr) -> str:
 
 def breaklines(string: SupportsStr, width: int, *, end: str = "\n") -> str:
     "its a wrap function that makes a text into lines fitting the required width"
-    return end.join(textwrap.wrap(str(string), width))
+    string = str(string)
+    if "\x1b" in string or not string.isascii():
+        return end.join(map(str, StyledText(string).wrap(width)))
+    import textwrap
+
+    return end.join(textwrap.wrap(string, width))
 
 
 def truncate(
@@ -260,20 +306,237 @@ def truncate(
 ) -> str:
     "shorten the string with an custom ending or an ellipsis if it reaches the max width"
     string, ellipsis = str(string), str(ellipsis)
+    if not (string + ellipsis).isascii() or "\x1b" in string + ellipsis:
+        return str(StyledText(string).truncate(max_width, ellipsis=ellipsis))
     return (
         string
-        if max_width <= len(string)
-        else (string[: max_width - len(ellipsis)] + ellipsis)
+        if len(string) <= max_width
+        else (string[: max(max_width - len(ellipsis), 0)] + ellipsis)
     )
 
 
+_ANSI_ESCAPE = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+
+# strings longer than this are measured without being kept alive by the cache
+_MEASURE_CACHE_LIMIT = 4096
+
+
 def remove_effects(string: SupportsStr, *, show_where_removed: bool = False) -> str:
     "remove all effects from the string"
-    ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-    stripped_text = ansi_escape.sub("(!)" if show_where_removed else "", str(string))
+    stripped_text = _ANSI_ESCAPE.sub("(!)" if show_where_removed else "", str(string))
     return stripped_text
 
 
+# terminal column widths of the unicode code points, as `(first code point,
+# width)` runs: 0 for combining/format characters (Mn, Me, Cf and the hangul
+# jamo vowels/finals), 2 for east asian wide and fullwidth characters.
+# generated from `unicodedata` (unicode 15.0.0)
+# fmt: off
+_WIDTH_RUNS = (
+    (0x00000, 1), (0x00300, 0), (0x00370, 1), (0x00483, 0), (0x0048A, 1), (0x00591, 0),
+    (0x005BE, 1), (0x005BF, 0), (0x005C0, 1), (0x005C1, 0), (0x005C3, 1), (0x005C4, 0),
+    (0x005C6, 1), (0x005C7, 0), (0x005C8, 1), (0x00600, 0), (0x00606, 1), (0x00610, 0),
+    (0x0061B, 1), (0x0061C, 0), (0x0061D, 1), (0x0064B, 0), (0x00660, 1), (0x00670, 0),
+    (0x00671, 1), (0x006D6, 0), (0x006DE, 1), (0x006DF, 0), (0x006E5, 1), (0x006E7, 0),
+    (0x006E9, 1), (0x006EA, 0), (0x006EE, 1), (0x0070F, 0), (0x00710, 1), (0x00711, 0),
+    (0x00712, 1), (0x00730, 0), (0x0074B, 1), (0x007A6, 0), (0x007B1, 1), (0x007EB, 0),
+    (0x007F4, 1), (0x007FD, 0), (0x007FE, 1), (0x00816, 0), (0x0081A, 1), (0x0081B, 0),
+    (0x00824, 1), (0x00825, 0), (0x00828, 1), (0x00829, 0), (0x0082E, 1), (0x00859, 0),
+    (0x0085C, 1), (0x00890, 0), (0x00892, 1), (0x00898, 0), (0x008A0, 1), (0x008CA, 0),
+    (0x00903, 1), (0x0093A, 0), (0x0093B, 1), (0x0093C, 0), (0x0093D, 1), (0x00941, 0),
+    (0x00949, 1), (0x0094D, 0), (0x0094E, 1), (0x00951, 0), (0x00958, 1), (0x00962, 0),
+    (0x00964, 1), (0x00981, 0), (0x00982, 1), (0x009BC, 0), (0x009BD, 1), (0x009C1, 0),
+    (0x009C5, 1), (0x009CD, 0), (0x009CE, 1), (0x009E2, 0), (0x009E4, 1), (0x009FE, 0),
+    (0x009FF, 1), (0x00A01, 0), (0x00A03, 1), (0x00A3C, 0), (0x00A3D, 1), (0x00A41, 0),
+    (0x00A43, 1), (0x00A47, 0), (0x00A49, 1), (0x00A4B, 0), (0x00A4E, 1), (0x00A51, 0),
+    (0x00A52, 1), (0x00A70, 0), (0x00A72, 1), (0x00A75, 0), (0x00A76, 1), (0x00A81, 0),
+    (0x00A83, 1), (0x00ABC, 0), (0x00ABD, 1), (0x00AC1, 0), (0x00AC6, 1), (0x00AC7, 0),
+    (0x00AC9, 1), (0x00ACD, 0), (0x00ACE, 1), (0x00AE2, 0), (0x00AE4, 1), (0x00AFA, 0),
+    (0x00B00, 1), (0x00B01, 0), (0x00B02, 1), (0x00B3C, 0), (0x00B3D, 1), (0x00B3F, 0),
+    (0x00B40, 1), (0x00B41, 0), (0x00B45, 1), (0x00B4D, 0), (0x00B4E, 1), (0x00B55, 0),
+    (0x00B57, 1), (0x00B62, 0), (0x00B64, 1), (0x00B82, 0), (0x00B83, 1), (0x00BC0, 0),
+    (0x00BC1, 1), (0x00BCD, 0), (0x00BCE, 1), (0x00C00, 0), (0x00C01, 1), (0x00C04, 0),
+    (0x00C05, 1), (0x00C3C, 0), (0x00C3D, 1), (0x00C3E, 0), (0x00C41, 1), (0x00C46, 0),
+    (0x00C49, 1), (0x00C4A, 0), (0x00C4E, 1), (0x00C55, 0), (0x00C57, 1), (0x00C62, 0),
+    (0x00C64, 1), (0x00C81, 0), (0x00C82, 1), (0x00CBC, 0), (0x00CBD, 1), (0x00CBF, 0),
+    (0x00CC0, 1), (0x00CC6, 0), (0x00CC7, 1), (0x00CCC, 0), (0x00CCE, 1), (0x00CE2, 0),
+    (0x00CE4, 1), (0x00D00, 0), (0x00D02, 1), (0x00D3B, 0), (0x00D3D, 1), (0x00D41, 0),
+    (0x00D45, 1), (0x00D4D, 0), (0x00D4E, 1), (0x00D62, 0), (0x00D64, 1), (0x00D81, 0),
+    (0x00D82, 1), (0x00DCA, 0), (0x00DCB, 1), (0x00DD2, 0), (0x00DD5, 1), (0x00DD6, 0),
+    (0x00DD7, 1), (0x00E31, 0), (0x00E32, 1), (0x00E34, 0), (0x00E3B, 1), (0x00E47, 0),
+    (0x00E4F, 1), (0x00EB1, 0), (0x00EB2, 1), (0x00EB4, 0), (0x00EBD, 1), (0x00EC8, 0),
+    (0x00ECF, 1), (0x00F18, 0), (0x00F1A, 1), (0x00F35, 0), (0x00F36, 1), (0x00F37, 0),
+    (0x00F38, 1), (0x00F39, 0), (0x00F3A, 1), (0x00F71, 0), (0x00F7F, 1), (0x00F80, 0),
+    (0x00F85, 1), (0x00F86, 0), (0x00F88, 1), (0x00F8D, 0), (0x00F98, 1), (0x00F99, 0),
+    (0x00FBD, 1), (0x00FC6, 0), (0x00FC7, 1), (0x0102D, 0), (0x01031, 1), (0x01032, 0),
+    (0x01038, 1), (0x01039, 0), (0x0103B, 1), (0x0103D, 0), (0x0103F, 1), (0x01058, 0),
+    (0x0105A, 1), (0x0105E, 0), (0x01061, 1), (0x01071, 0), (0x01075, 1), (0x01082, 0),
+    (0x01083, 1), (0x01085, 0), (0x01087, 1), (0x0108D, 0), (0x0108E, 1), (0x0109D, 0),
+    (0x0109E, 1), (0x01100, 2), (0x01160, 0), (0x01200, 1), (0x0135D, 0), (0x01360, 1),
+    (0x01712, 0), (0x01715, 1), (0x01732, 0), (0x01734, 1), (0x01752, 0), (0x01754, 1),
+    (0x01772, 0), (0x01774, 1), (0x017B4, 0), (0x017B6, 1), (0x017B7, 0), (0x017BE, 1),
+    (0x017C6, 0), (0x017C7, 1), (0x017C9, 0), (0x017D4, 1), (0x017DD, 0), (0x017DE, 1),
+    (0x0180B, 0), (0x01810, 1), (0x01885, 0), (0x01887, 1), (0x018A9, 0), (0x018AA, 1),
+    (0x01920, 0), (0x01923, 1), (0x01927, 0), (0x01929, 1), (0x01932, 0), (0x01933, 1),
+    (0x01939, 0), (0x0193C, 1), (0x01A17, 0), (0x01A19, 1), (0x01A1B, 0), (0x01A1C, 1),
+    (0x01A56, 0), (0x01A57, 1), (0x01A58, 0), (0x01A5F, 1), (0x01A60, 0), (0x01A61, 1),
+    (0x01A62, 0), (0x01A63, 1), (0x01A65, 0), (0x01A6D, 1), (0x01A73, 0), (0x01A7D, 1),
+    (0x01A7F, 0), (0x01A80, 1), (0x01AB0, 0), (0x01ACF, 1), (0x01B00, 0), (0x01B04, 1),
+    (0x01B34, 0), (0x01B35, 1), (0x01B36, 0), (0x01B3B, 1), (0x01B3C, 0), (0x01B3D, 1),
+    (0x01B42, 0), (0x01B43, 1), (0x01B6B, 0), (0x01B74, 1), (0x01B80, 0), (0x01B82, 1),
+    (0x01BA2, 0), (0x01BA6, 1), (0x01BA8, 0), (0x01BAA, 1), (0x01BAB, 0), (0x01BAE, 1),
+    (0x01BE6, 0), (0x01BE7, 1), (0x01BE8, 0), (0x01BEA, 1), (0x01BED, 0), (0x01BEE, 1),
+    (0x01BEF, 0), (0x01BF2, 1), (0x01C2C, 0), (0x01C34, 1), (0x01C36, 0), (0x01C38, 1),
+    (0x01CD0, 0), (0x01CD3, 1), (0x01CD4, 0), (0x01CE1, 1), (0x01CE2, 0), (0x01CE9, 1),
+    (0x01CED, 0), (0x01CEE, 1), (0x01CF4, 0), (0x01CF5, 1), (0x01CF8, 0), (0x01CFA, 1),
+    (0x01DC0, 0), (0x01E00, 1), (0x0200B, 0), (0x02010, 1), (0x0202A, 0), (0x0202F, 1),
+    (0x02060, 0), (0x02065, 1), (0x02066, 0), (0x02070, 1), (0x020D0, 0), (0x020F1, 1),
+    (0x0231A, 2), (0x0231C, 1), (0x02329, 2), (0x0232B, 1), (0x023E9, 2), (0x023ED, 1),
+    (0x023F0, 2), (0x023F1, 1), (0x023F3, 2), (0x023F4, 1), (0x025FD, 2), (0x025FF, 1),
+    (0x02614, 2), (0x02616, 1), (0x02648, 2), (0x02654, 1), (0x0267F, 2), (0x02680, 1),
+    (0x02693, 2), (0x02694, 1), (0x026A1, 2), (0x026A2, 1), (0x026AA, 2), (0x026AC, 1),
+    (0x026BD, 2), (0x026BF, 1), (0x026C4, 2), (0x026C6, 1), (0x026CE, 2), (0x026CF, 1),
+    (0x026D4, 2), (0x026D5, 1), (0x026EA, 2), (0x026EB, 1), (0x026F2, 2), (0x026F4, 1),
+    (0x026F5, 2), (0x026F6, 1), (0x026FA, 2), (0x026FB, 1), (0x026FD, 2), (0x026FE, 1),
+    (0x02705, 2), (0x02706, 1), (0x0270A, 2), (0x0270C, 1), (0x02728, 2), (0x02729, 1),
+    (0x0274C, 2), (0x0274D, 1), (0x0274E, 2), (0x0274F, 1), (0x02753, 2), (0x02756, 1),
+    (0x02757, 2), (0x02758, 1), (0x02795, 2), (0x02798, 1), (0x027B0, 2), (0x027B1, 1),
+    (0x027BF, 2), (0x027C0, 1), (0x02B1B, 2), (0x02B1D, 1), (0x02B50, 2), (0x02B51, 1),
+    (0x02B55, 2), (0x02B56, 1), (0x02CEF, 0), (0x02CF2, 1), (0x02D7F, 0), (0x02D80, 1),
+    (0x02DE0, 0), (0x02E00, 1), (0x02E80, 2), (0x02E9A, 1), (0x02E9B, 2), (0x02EF4, 1),
+    (0x02F00, 2), (0x02FD6, 1), (0x02FF0, 2), (0x02FFC, 1), (0x03000, 2), (0x0302A, 0),
+    (0x0302E, 2), (0x0303F, 1), (0x03041, 2), (0x03097, 1), (0x03099, 0), (0x0309B, 2),
+    (0x03100, 1), (0x03105, 2), (0x03130, 1), (0x03131, 2), (0x0318F, 1), (0x03190, 2),
+    (0x031E4, 1), (0x031F0, 2), (0x0321F, 1), (0x03220, 2), (0x03248, 1), (0x03250, 2),
+    (0x04DC0, 1), (0x04E00, 2), (0x0A48D, 1), (0x0A490, 2), (0x0A4C7, 1), (0x0A66F, 0),
+    (0x0A673, 1), (0x0A674, 0), (0x0A67E, 1), (0x0A69E, 0), (0x0A6A0, 1), (0x0A6F0, 0),
+    (0x0A6F2, 1), (0x0A802, 0), (0x0A803, 1), (0x0A806, 0), (0x0A807, 1), (0x0A80B, 0),
+    (0x0A80C, 1), (0x0A825, 0), (0x0A827, 1), (0x0A82C, 0), (0x0A82D, 1), (0x0A8C4, 0),
+    (0x0A8C6, 1), (0x0A8E0, 0), (0x0A8F2, 1), (0x0A8FF, 0), (0x0A900, 1), (0x0A926, 0),
+    (0x0A92E, 1), (0x0A947, 0), (0x0A952, 1), (0x0A960, 2), (0x0A97D, 1), (0x0A980, 0),
+    (0x0A983, 1), (0x0A9B3, 0), (0x0A9B4, 1), (0x0A9B6, 0), (0x0A9BA, 1), (0x0A9BC, 0),
+    (0x0A9BE, 1), (0x0A9E5, 0), (0x0A9E6, 1), (0x0AA29, 0), (0x0AA2F, 1), (0x0AA31, 0),
+    (0x0AA33, 1), (0x0AA35, 0), (0x0AA37, 1), (0x0AA43, 0), (0x0AA44, 1), (0x0AA4C, 0),
+    (0x0AA4D, 1), (0x0AA7C, 0), (0x0AA7D, 1), (0x0AAB0, 0), (0x0AAB1, 1), (0x0AAB2, 0),
+    (0x0AAB5, 1), (0x0AAB7, 0), (0x0AAB9, 1), (0x0AABE, 0), (0x0AAC0, 1), (0x0AAC1, 0),
+    (0x0AAC2, 1), (0x0AAEC, 0), (0x0AAEE, 1), (0x0AAF6, 0), (0x0AAF7, 1), (0x0ABE5, 0),
+    (0x0ABE6, 1), (0x0ABE8, 0), (0x0ABE9, 1), (0x0ABED, 0), (0x0ABEE, 1), (0x0AC00, 2),
+    (0x0D7A4, 1), (0x0F900, 2), (0x0FB00, 1), (0x0FB1E, 0), (0x0FB1F, 1), (0x0FE00, 0),
+    (0x0FE10, 2), (0x0FE1A, 1), (0x0FE20, 0), (0x0FE30, 2), (0x0FE53, 1), (0x0FE54, 2),
+    (0x0FE67, 1), (0x0FE68, 2), (0x0FE6C, 1), (0x0FEFF, 0), (0x0FF00, 1), (0x0FF01, 2),
+    (0x0FF61, 1), (0x0FFE0, 2), (0x0FFE7, 1), (0x0FFF9, 0), (0x0FFFC, 1), (0x101FD, 0),
+    (0x101FE, 1), (0x102E0, 0), (0x102E1, 1), (0x10376, 0), (0x1037B, 1), (0x10A01, 0),
+    (0x10A04, 1), (0x10A05, 0), (0x10A07, 1), (0x10A0C, 0), (0x10A10, 1), (0x10A38, 0),
+    (0x10A3B, 1), (0x10A3F, 0), (0x10A40, 1), (0x10AE5, 0), (0x10AE7, 1), (0x10D24, 0),
+    (0x10D28, 1), (0x10EAB, 0), (0x10EAD, 1), (0x10EFD, 0), (0x10F00, 1), (0x10F46, 0),
+    (0x10F51, 1), (0x10F82, 0), (0x10F86, 1), (0x11001, 0), (0x11002, 1), (0x11038, 0),
+    (0x11047, 1), (0x11070, 0), (0x11071, 1), (0x11073, 0), (0x11075, 1), (0x1107F, 0),
+    (0x11082, 1), (0x110B3, 0), (0x110B7, 1), (0x110B9, 0), (0x110BB, 1), (0x110BD, 0),
+    (0x110BE, 1), (0x110C2, 0), (0x110C3, 1), (0x110CD, 0), (0x110CE, 1), (0x11100, 0),
+    (0x11103, 1), (0x11127, 0), (0x1112C, 1), (0x1112D, 0), (0x11135, 1), (0x11173, 0),
+    (0x11174, 1), (0x11180, 0), (0x11182, 1), (0x111B6, 0), (0x111BF, 1), (0x111C9, 0),
+    (0x111CD, 1), (0x111CF, 0), (0x111D0, 1), (0x1122F, 0), (0x11232, 1), (0x11234, 0),
+    (0x11235, 1), (0x11236, 0), (0x11238, 1), (0x1123E, 0), (0x1123F, 1), (0x11241, 0),
+    (0x11242, 1), (0x112DF, 0), (0x112E0, 1), (0x112E3, 0), (0x112EB, 1), (0x11300, 0),
+    (0x11302, 1), (0x1133B, 0), (0x1133D, 1), (0x11340, 0), (0x11341, 1), (0x11366, 0),
+    (0x1136D, 1), (0x11370, 0), (0x11375, 1), (0x11438, 0), (0x11440, 1), (0x11442, 0),
+    (0x11445, 1), (0x11446, 0), (0x11447, 1), (0x1145E, 0), (0x1145F, 1), (0x114B3, 0),
+    (0x114B9, 1), (0x114BA, 0), (0x114BB, 1), (0x114BF, 0), (0x114C1, 1), (0x114C2, 0),
+    (0x114C4, 1), (0x115B2, 0), (0x115B6, 1), (0x115BC, 0), (0x115BE, 1), (0x115BF, 0),
+    (0x115C1, 1), (0x115DC, 0), (0x115DE, 1), (0x11633, 0), (0x1163B, 1), (0x1163D, 0),
+    (0x1163E, 1), (0x1163F, 0), (0x11641, 1), (0x116AB, 0), (0x116AC, 1), (0x116AD, 0),
+    (0x116AE, 1), (0x116B0, 0), (0x116B6, 1), (0x116B7, 0), (0x116B8, 1), (0x1171D, 0),
+    (0x11720, 1), (0x11722, 0), (0x11726, 1), (0x11727, 0), (0x1172C, 1), (0x1182F, 0),
+    (0x11838, 1), (0x11839, 0), (0x1183B, 1), (0x1193B, 0), (0x1193D, 1), (0x1193E, 0),
+    (0x1193F, 1), (0x11943, 0), (0x11944, 1), (0x119D4, 0), (0x119D8, 1), (0x119DA, 0),
+    (0x119DC, 1), (0x119E0, 0), (0x119E1, 1), (0x11A01, 0), (0x11A0B, 1), (0x11A33, 0),
+    (0x11A39, 1), (0x11A3B, 0), (0x11A3F, 1), (0x11A47, 0), (0x11A48, 1), (0x11A51, 0),
+    (0x11A57, 1), (0x11A59, 0), (0x11A5C, 1), (0x11A8A, 0), (0x11A97, 1), (0x11A98, 0),
+    (0x11A9A, 1), (0x11C30, 0), (0x11C37, 1), (0x11C38, 0), (0x11C3E, 1), (0x11C3F, 0),
+    (0x11C40, 1), (0x11C92, 0), (0x11CA8, 1), (0x11CAA, 0), (0x11CB1, 1), (0x11CB2, 0),
+    (0x11CB4, 1), (0x11CB5, 0), (0x11CB7, 1), (0x11D31, 0), (0x11D37, 1), (0x11D3A, 0),
+    (0x11D3B, 1), (0x11D3C, 0), (0x11D3E, 1), (0x11D3F, 0), (0x11D46, 1), (0x11D47, 0),
+    (0x11D48, 1), (0x11D90, 0), (0x11D92, 1), (0x11D95, 0), (0x11D96, 1), (0x11D97, 0),
+    (0x11D98, 1), (0x11EF3, 0), (0x11EF5, 1), (0x11F00, 0), (0x11F02, 1), (0x11F36, 0),
+    (0x11F3B, 1), (0x11F40, 0), (0x11F41, 1), (0x11F42, 0), (0x11F43, 1), (0x13430, 0),
+    (0x13441, 1), (0x13447, 0), (0x13456, 1), (0x16AF0, 0), (0x16AF5, 1), (0x16B30, 0),
+    (0x16B37, 1), (0x16F4F, 0), (0x16F50, 1), (0x16F8F, 0), (0x16F93, 1), (0x16FE0, 2),
+    (0x16FE4, 0), (0x16FE5, 1), (0x16FF0, 2), (0x16FF2, 1), (0x17000, 2), (0x187F8, 1),
+    (0x18800, 2), (0x18CD6, 1), (0x18D00, 2), (0x18D09, 1), (0x1AFF0, 2), (0x1AFF4, 1),
+    (0x1AFF5, 2), (0x1AFFC, 1), (0x1AFFD, 2), (0x1AFFF, 1), (0x1B000, 2), (0x1B123, 1),
+    (0x1B132, 2), (0x1B133, 1), (0x1B150, 2), (0x1B153, 1), (0x1B155, 2), (0x1B156, 1),
+    (0x1B164, 2), (0x1B168, 1), (0x1B170, 2), (0x1B2FC, 1), (0x1BC9D, 0), (0x1BC9F, 1),
+    (0x1BCA0, 0), (0x1BCA4, 1), (0x1CF00, 0), (0x1CF2E, 1), (0x1CF30, 0), (0x1CF47, 1),
+    (0x1D167, 0), (0x1D16A, 1), (0x1D173, 0), (0x1D183, 1), (0x1D185, 0), (0x1D18C, 1),
+    (0x1D1AA, 0), (0x1D1AE, 1), (0x1D242, 0), (0x1D245, 1), (0x1DA00, 0), (0x1DA37, 1),
+    (0x1DA3B, 0), (0x1DA6D, 1), (0x1DA75, 0), (0x1DA76, 1), (0x1DA84, 0), (0x1DA85, 1),
+    (0x1DA9B, 0), (0x1DAA0, 1), (0x1DAA1, 0), (0x1DAB0, 1), (0x1E000, 0), (0x1E007, 1),
+    (0x1E008, 0), (0x1E019, 1), (0x1E01B, 0), (0x1E022, 1), (0x1E023, 0), (0x1E025, 1),
+    (0x1E026, 0), (0x1E02B, 1), (0x1E08F, 0), (0x1E090, 1), (0x1E130, 0), (0x1E137, 1),
+    (0x1E2AE, 0), (0x1E2AF, 1), (0x1E2EC, 0), (0x1E2F0, 1), (0x1E4EC, 0), (0x1E4F0, 1),
+    (0x1E8D0, 0), (0x1E8D7, 1), (0x1E944, 0), (0x1E94B, 1), (0x1F004, 2), (0x1F005, 1),
+    (0x1F0CF, 2), (0x1F0D0, 1), (0x1F18E, 2), (0x1F18F, 1), (0x1F191, 2), (0x1F19B, 1),
+    (0x1F200, 2), (0x1F203, 1), (0x1F210, 2), (0x1F23C, 1), (0x1F240, 2), (0x1F249, 1),
+    (0x1F250, 2), (0x1F252, 1), (0x1F260, 2), (0x1F266, 1), (0x1F300, 2), (0x1F321, 1),
+    (0x1F32D, 2), (0x1F336, 1), (0x1F337, 2), (0x1F37D, 1), (0x1F37E, 2), (0x1F394, 1),
+    (0x1F3A0, 2), (0x1F3CB, 1), (0x1F3CF, 2), (0x1F3D4, 1), (0x1F3E0, 2), (0x1F3F1, 1),
+    (0x1F3F4, 2), (0x1F3F5, 1), (0x1F3F8, 2), (0x1F43F, 1), (0x1F440, 2), (0x1F441, 1),
+    (0x1F442, 2), (0x1F4FD, 1), (0x1F4FF, 2), (0x1F53E, 1), (0x1F54B, 2), (0x1F54F, 1),
+    (0x1F550, 2), (0x1F568, 1), (0x1F57A, 2), (0x1F57B, 1), (0x1F595, 2), (0x1F597, 1),
+    (0x1F5A4, 2), (0x1F5A5, 1), (0x1F5FB, 2), (0x1F650, 1), (0x1F680, 2), (0x1F6C6, 1),
+    (0x1F6CC, 2), (0x1F6CD, 1), (0x1F6D0, 2), (0x1F6D3, 1), (0x1F6D5, 2), (0x1F6D8, 1),
+    (0x1F6DC, 2), (0x1F6E0, 1), (0x1F6EB, 2), (0x1F6ED, 1), (0x1F6F4, 2), (0x1F6FD, 1),
+    (0x1F7E0, 2), (0x1F7EC, 1), (0x1F7F0, 2), (0x1F7F1, 1), (0x1F90C, 2), (0x1F93B, 1),
+    (0x1F93C, 2), (0x1F946, 1), (0x1F947, 2), (0x1FA00, 1), (0x1FA70, 2), (0x1FA7D, 1),
+    (0x1FA80, 2), (0x1FA89, 1), (0x1FA90, 2), (0x1FABE, 1), (0x1FABF, 2), (0x1FAC6, 1),
+    (0x1FACE, 2), (0x1FADC, 1), (0x1FAE0, 2), (0x1FAE9, 1), (0x1FAF0, 2), (0x1FAF9, 1),
+    (0x20000, 2), (0x2FFFE, 1), (0x30000, 2), (0x3FFFE, 1), (0xE0001, 0), (0xE0002, 1),
+    (0xE0020, 0), (0xE0080, 1), (0xE0100, 0), (0xE01F0, 1),
+)
+# fmt: on
+_WIDTH_STARTS = tuple(start for start, _ in _WIDTH_RUNS)
+_WIDTH_VALUES = bytes(width for _, width in _WIDTH_RUNS)
+
+
+def charwidth(char: str) -> int:
+    "the number of terminal columns a character takes: 0 for combining marks, 2 for wide glyphs"
+    code = ord(char)
+    if code < 0x300:
+        return 1
+    return _WIDTH_VALUES[bisect_right(_WIDTH_STARTS, code) - 1]
+
+
+def strwidth(string: str) -> int:
+    "the number of terminal columns a string without escape codes takes"
+    if string.isascii():
+        return len(string)
+    return sum(map(charwidth, string))
+
+
+def _measure_lines(string: str) -> tuple[int, ...]:
+    if "\x1b" in string:
+        string = _ANSI_ESCAPE.sub("", string)
+    if string.isascii():
+        return tuple(map(len, string.splitlines()))
+    return tuple(map(strwidth, string.splitlines()))
+
+
+_measure_lines_cached = lru_cache(maxsize=8192)(_measure_lines)
+
+
+def measure(string: SupportsStr) -> tuple[int, ...]:
+    "the visible width of every line in the string, measured once and cached"
+    string = str(string)
+    if len(string) > _MEASURE_CACHE_LIMIT:
+        return _measure_lines(string)
+    return _measure_lines_cached(string)
+
+
+def visible_width(string: SupportsStr) -> int:
+    "the visible width of the widest line in the string"
+    return max(measure(string), default=0)
+
+
 def splitchar(line: SupportsStr) -> list[str]:
     "Split a line into a list of characters and controls"
     ansi_escape = re.compile(r"(\x1B\[[0-?]*[ -/]*[@-~]|[^\x1B]+)")
@@ -289,6 +552,304 @@ def splitchar(line: SupportsStr) -> list[str]:
     return chars
 
 
+_CELL_TOKENS = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]|[^\x1B]")
+
+
+# the attribute an SGR parameter sets, codes missing here are their own attribute
+_SGR_SLOTS = {
+    **{code: "fg" for code in (*range(30, 39), *range(90, 98))},
+    **{code: "bg" for code in (*range(40, 49), *range(100, 108))},
+    **{code: "font" for code in range(11, 20)},
+    6: "5",
+    21: "4",
+}
+# the attributes turned off by a code
+_SGR_RESETS = {
+    10: ("font",),
+    22: ("1", "2"),
+    23: ("3",),
+    24: ("4",),
+    25: ("5",),
+    27: ("7",),
+    28: ("8",),
+    29: ("9",),
+    39: ("fg",),
+    49: ("bg",),
+    55: ("53",),
+    59: ("58",),
+}
+
+
+def _sgr_slot(param: str) -> str:
+    number = param.split(":", 1)[0].split(";", 1)[0]
+    return _SGR_SLOTS.get(int(number), number) if number.isdigit() else param
+
+
+@lru_cache(maxsize=4096)
+def _apply_sgr(style: str, code: str) -> str:
+    """
+    the style in effect after the SGR escape `code`, kept as one escape per
+    attribute so a later color or attribute replaces the earlier one
+    instead of piling up (a gradient would make every style unique).
+    """
+    slots = {
+        _sgr_slot(escape): escape for escape in style[2:-1].split("m\x1b[") if escape
+    }
+    params = code[2:-1].split(";")
+    index = 0
+    while index < len(params):
+        param = params[index]
+        index += 1
+        number = int(param) if param.isdigit() else None
+        if not param or number == 0:
+            slots.clear()
+        elif number in _SGR_RESETS:
+            for slot in _SGR_RESETS[number]:
+                slots.pop(slot, None)
+        elif number in (38, 48, 58) and index < len(params):
+            # extended colors take their arguments from the next parameters
+            end = index + {"5": 2, "2": 4}.get(params[index], 0)
+            slots[_sgr_slot(param)] = ";".join(params[index - 1 : end])
+            index = end
+        else:
+            slots[_sgr_slot(param)] = param
+    return "".join(f"\x1b[{slots[slot]}m" for slot in sorted(slots))
+
+
+def cells(line: SupportsStr) -> list[tuple[str, str]]:
+    "split a line into `(style, glyph)` cells, folding escape codes into the style of the glyphs after them"
+    result: list[tuple[str, str]] = []
+    style = ""
+    for token in _CELL_TOKENS.findall(str(line)):
+        if len(token) == 1:
+            # everything below U+0300 is one column wide
+            if token < "\u0300" or (width := charwidth(token)) == 1:
+                result.append((style, token))
+            elif width == 2:
+                # wide glyphs take two cells, the second one stays empty
+                result.append((style, token))
+                result.append((style, ""))
+            elif result:
+                # combining marks are drawn over the glyph before them
+                index = -2 if result[-1][1] == "" else -1
+                result[index] = (result[index][0], result[index][1] + token)
+            else:
+                result.append((style, " " + token))
+        elif token[-1] == "m":
+            style = _apply_sgr(style, token)
+    return result
+
+
+_SPAN_TOKENS = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])|[^\x1B]+|\x1B")
+_WORDS = re.compile(r"\S+")
+_WHITESPACE_TO_SPACE = str.maketrans("\t\n\x0b\x0c\r", "     ")
+
+
+class StyledText:
+    """
+    a string parsed once into `(text, style)` spans, so it can be sliced,
+    wrapped and measured by terminal column without splitting escape codes
+    (its length is its width in columns, wide glyphs count twice).
+    the style of a span is every SGR code in effect since the last reset,
+    other escape codes carry no text and are dropped.
+    """
+
+    spans: list[tuple[str, str]]
+
+    def __init__(self, string: SupportsStr = "") -> None:
+        string = str(string)
+        if "\x1b" not in string:
+            self.spans = [(string, "")] if string else []
+            return
+        spans: list[tuple[str, str]] = []
+        style = ""
+        for token in _SPAN_TOKENS.findall(string):
+            if token[0] != "\x1b":
+                if spans and spans[-1][1] == style:
+                    spans[-1] = (spans[-1][0] + token, style)
+                else:
+                    spans.append((token, style))
+            elif token[-1] == "m" and token[1:2] == "[":
+                style = "" if token in ("\x1b[0m", "\x1b[m") else style + token
+        self.spans = spans
+
+    @classmethod
+    def from_spans(cls, spans: Iterable[tuple[str, str]]) -> "StyledText":
+        "build from `(text, style)` spans, merging neighbours that share a style"
+        self = cls.__new__(cls)
+        self.spans = []
+        for text, style in spans:
+            if not text:
+                continue
+            if self.spans and self.spans[-1][1] == style:
+                self.spans[-1] = (self.spans[-1][0] + text, style)
+            else:
+                self.spans.append((text, style))
+        return self
+
+    @property
+    def plain(self) -> str:
+        "the text without any styling"
+        return "".join(text for text, _ in self.spans)
+
+    def __len__(self) -> int:
+        return sum(strwidth(text) for text, _ in self.spans)
+
+    def __str__(self) -> str:
+        "serialize with the fewest escapes, emitting only what changes between spans"
+        parts: list[str] = []
+        current = ""
+        for text, style in self.spans:
+            if style != current:
+                if not style.startswith(current):
+                    parts.append("\x1b[0m")
+                    current = ""
+                parts.append(style[len(current) :])
+                current = style
+            parts.append(text)
+        if current:
+            parts.append("\x1b[0m")
+        return "".join(parts)
+
+    def __repr__(self) -> str:
+        return f"StyledText({str(self)!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, StyledText) and self.spans == other.spans
+
+    def __add__(self, other: "StyledText | SupportsStr") -> "StyledText":
+        if not isinstance(other, StyledText):
+            other = StyledText(other)
+        return StyledText.from_spans(self.spans + other.spans)
+
+    def __neon_measure__(self) -> tuple[int, int]:
+        lines = self.lines()
+        return max((strwidth(line.plain) for line in lines), default=0), len(lines)
+
+    def __getitem__(self, key: int | slice) -> "StyledText":
+        "slice by column, the kept text keeps its styles and wide glyphs cut in half are dropped"
+        if isinstance(key, int):
+            length = len(self)
+            index = key + length if key < 0 else key
+            if not 0 <= index < length:
+                raise IndexError("StyledText index out of range")
+            key = slice(index, index + 1)
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            raise ValueError("StyledText slices cannot have a step")
+        spans: list[tuple[str, str]] = []
+        offset = 0
+        for text, style in self.spans:
+            if offset >= stop:
+                break
+            end = offset + strwidth(text)
+            if end > start:
+                spans.append(
+                    (_column_slice(text, start - offset, stop - offset), style)
+                )
+            offset = end
+        return StyledText.from_spans(spans)
+
+    def lines(self) -> list["StyledText"]:
+        "split like `str.splitlines`, every line keeps the styles carried over from the previous ones"
+        lines: list[StyledText] = []
+        current: list[tuple[str, str]] = []
+        for text, style in self.spans:
+            for piece in text.splitlines(keepends=True):
+                body = piece.splitlines()[0]
+                current.append((body, style))
+                if len(body) != len(piece):
+                    lines.append(StyledText.from_spans(current))
+                    current = []
+        if any(text for text, _ in current):
+            lines.append(StyledText.from_spans(current))
+        return lines
+
+    def reverse(self) -> "StyledText":
+        "the text backwards, every character keeps its style"
+        return StyledText.from_spans(
+            (text[::-1], style) for text, style in reversed(self.spans)
+        )
+
+    def truncate(
+        self, width: int, *, ellipsis: "StyledText | SupportsStr" = "..."
+    ) -> "StyledText":
+        "cut down to `width` columns, ending with the ellipsis when something was removed"
+        if len(self) <= width:
+            return self
+        if not isinstance(ellipsis, StyledText):
+            ellipsis = StyledText(ellipsis)
+        return (self[: max(width - len(ellipsis), 0)] + ellipsis)[:width]
+
+    def wrap(self, width: int) -> list["StyledText"]:
+        "break into lines of at most `width` columns at whitespace, splitting longer words"
+        if width <= 0:
+            raise ValueError(f"invalid width {width!r} (must be > 0)")
+        plain = self.plain
+        # the column every character starts at, cuts are moved back to the
+        # start of a glyph so no wide glyph is split between two lines
+        columns: Sequence[int] = range(len(plain) + 1)
+        if not plain.isascii():
+            columns = [0]
+            for char in plain:
+                columns.append(columns[-1] + charwidth(char))
+
+        def boundary(column: int) -> int:
+            return columns[bisect_right(columns, column) - 1]
+
+        ranges: list[tuple[int, int]] = []
+        start = stop = -1
+        for match in _WORDS.finditer(plain):
+            begin, end = columns[match.start()], columns[match.end()]
+            if start >= 0 and end - start <= width:
+                stop = end
+                continue
+            if start >= 0:
+                # like textwrap, a long word first fills what is left of the line
+                space = width - (begin - start) if end - begin > width else 0
+                if space > 0 and boundary(begin + space) > begin:
+                    stop = begin = boundary(begin + space)
+                ranges.append((start, stop))
+            while end - begin > width:
+                cut = boundary(begin + width)
+                if cut <= begin:
+                    # a glyph wider than the line still has to go somewhere
+                    cut = columns[bisect_right(columns, begin)]
+                ranges.append((begin, cut))
+                begin = cut
+            start, stop = begin, end
+        if start >= 0:
+            ranges.append((start, stop))
+        return [
+            StyledText.from_spans(
+                (text.translate(_WHITESPACE_TO_SPACE), style)
+                for text, style in self[begin:end].spans
+            )
+            for begin, end in ranges
+        ]
+
+
+def _column_slice(text: str, start: int, stop: int) -> str:
+    "the characters of `text` between two columns, wide glyphs cut in half are dropped"
+    start = max(start, 0)
+    if text.isascii():
+        return text[start:stop]
+    result: list[str] = []
+    column = 0
+    kept = False
+    for char in text:
+        width = charwidth(char)
+        if width:
+            if column >= stop:
+                break
+            kept = start <= column and column + width <= stop
+            column += width
+        # combining marks go with the glyph before them
+        if kept:
+            result.append(char)
+    return "".join(result)
+
+
 def isEscapeCode(code: SupportsStr) -> bool:
     "Check if a string is an escape code"
     return str(code).startswith("\x1b[")
@@ -384,22 +945,57 @@ class Segment:
 class Line:
     "store a single line with a newline code at the end"
 
-    line: str
-    newline: str = "\n"
+    _line: str
+    _newline: str = "\n"
+    # the multiline chunks whose cached string holds this line, see `_changed`
+    _chunks: "tuple[weakref.ref[_Chunk], ...]" = ()
 
     def __init__(self, text: SupportsStr = "", *, newline: SupportsStr = "\n") -> None:
         text, newline = str(text), str(newline)
-        if len(text.splitlines()) == 0:
-            self.line = ""
-        else:
-            self.line = text.splitlines()[0]
-        self.newline = newline
+        lines = text.splitlines()
+        self._line = lines[0] if lines else ""
+        self._newline = newline
+
+    @property
+    def line(self) -> str:
+        "the text of the line"
+        return self._line
+
+    @line.setter
+    def line(self, line: str):
+        self._line = line
+        self._changed()
+
+    @property
+    def newline(self) -> str:
+        "the newline code ending the line"
+        return self._newline
+
+    @newline.setter
+    def newline(self, newline: str):
+        self._newline = newline
+        self._changed()
+
+    def _changed(self):
+        "drop the cached strings of the chunks holding this line"
+        for ref in self._chunks:
+            chunk = ref()
+            if chunk is not None:
+                chunk.string = None
+        self._chunks = ()
+
+    def _watch(self, chunk: "weakref.ref[_Chunk]"):
+        watched = self._chunks
+        if not watched:
+            self._chunks = (chunk,)
+        elif all(ref is not chunk for ref in watched):
+            self._chunks = (*[ref for ref in watched if ref() is not None], chunk)
 
     def __repr__(self) -> str:
         return "'" + self.line + "\\n" + "'"
 
     def __str__(self) -> str:
-        return self.line + self.newline
+        return self._line + self._newline
 
     def len(self):
         return len(self.line)
@@ -411,56 +1007,252 @@ class Line:
         elif isinstance(other, Segment):
             return Line(self.line + other.text, newline=self.newline)
         elif isinstance(other, Line):
-            return Multiline(
-                (str(self) + str(other)), newline=(self.newline or other.newline)
+            newline = self.newline or other.newline
+            return Multiline.from_lines(
+                [Line(self.line, newline=newline), Line(other.line, newline=newline)]
             )
         elif isinstance(other, SupportsStr):
             return Line(self.line + str(other), newline=self.newline)
 
 
+class _Chunk(list[Line]):
+    "a run of lines of a `Multiline` and their string form (None until rendered again)"
+
+    string: str | None = None
+
+
 class Multiline:
     "stores multiple Line `objects`"
 
-    lines: list[Line]
+    # lines are kept in chunks (a flat rope): a Fenwick tree over the chunk
+    # lengths finds a line in O(log n) and every chunk caches its string form
+    CHUNK_SIZE = 512
+
+    _chunks: list[_Chunk]
+    _tree: list[int]
+    _length: int
 
     def __init__(
         self, string: SupportsStr = "", *, newline: SupportsStr = "\n"
     ) -> None:
         string, newline = str(string), str(newline)
-        self.lines = [Line(line, newline=newline) for line in string.splitlines()]
+        self._load([Line(line, newline=newline) for line in string.splitlines()])
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[Line]) -> "Multiline":
+        "build a multiline from existing `Line` objects without re-parsing them"
+        result = cls()
+        result._load(list(lines))
+        return result
+
+    def _load(self, lines: list[Line]):
+        size = self.CHUNK_SIZE
+        self._chunks = [
+            _Chunk(lines[i : i + size]) for i in range(0, len(lines), size)
+        ] or [_Chunk()]
+        self._length = len(lines)
+        self._rebuild()
+
+    def _rebuild(self):
+        tree = [0] * (len(self._chunks) + 1)
+        for index, chunk in enumerate(self._chunks, 1):
+            tree[index] += len(chunk)
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        self._tree = tree
+
+    def _grow(self, chunk: int, delta: int):
+        self._length += delta
+        self._chunks[chunk].string = None
+        index = chunk + 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        "returns the chunk holding the line at `index` and the offset inside it"
+        if index < 0:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError("multiline index out of range")
+        position, step = 0, 1 << (len(self._tree).bit_length() - 1)
+        while step:
+            if (
+                position + step < len(self._tree)
+                and self._tree[position + step] <= index
+            ):
+                position += step
+                index -= self._tree[position]
+            step >>= 1
+        return position, index
+
+    @property
+    def lines(self) -> "MultilineView":
+        "a live list-like view of the lines (assigning a list replaces them)"
+        return MultilineView(self)
+
+    @lines.setter
+    def lines(self, lines: Iterable[Line | str]):
+        self._load([line if isinstance(line, Line) else Line(line) for line in lines])
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            return Multiline.from_lines(
+                self[i] for i in range(*index.indices(self._length))
+            )
+        chunk, offset = self._locate(index)
+        return self._chunks[chunk][offset]
+
+    def __setitem__(self, index: int, line: SupportsStr | Line):
+        chunk, offset = self._locate(index)
+        old = self._chunks[chunk][offset]
+        if not isinstance(line, Line):
+            line = Line(line, newline=old.newline)
+        self._chunks[chunk][offset] = line
+        self._chunks[chunk].string = None
+
+    def __delitem__(self, index: int):
+        chunk, offset = self._locate(index)
+        del self._chunks[chunk][offset]
+        self._grow(chunk, -1)
+        if not self._chunks[chunk] and len(self._chunks) > 1:
+            del self._chunks[chunk]
+            self._rebuild()
 
     def __repr__(self) -> str:
-        return "\n".join([repr(line) for line in self.lines])
+        return "\n".join([repr(line) for line in self])
+
+    def _newline(self, index: int) -> str:
+        if self._length == 0:
+            return "\n"
+        return self[min(index, self._length - 1)].newline
 
     def append(self, line: Line | str):
         if isinstance(line, str):
-            newline = self.lines[-1].newline if len(self.lines) > 0 else "\n"
-            self.lines.append(Line(line, newline=newline))
-        elif isinstance(line, Line):
-            self.lines.append(line)
+            line = Line(line, newline=self._newline(-1))
+        if isinstance(line, Line):
+            self._insert(len(self._chunks) - 1, len(self._chunks[-1]), line)
+
+    def extend(self, lines: Iterable[Line | str]):
+        for line in lines:
+            self.append(line)
 
     def insert(self, index: int, line: SupportsStr | Line):
-        if isinstance(line, Line):
-            self.lines.insert(index, line)
-        elif isinstance(line, SupportsStr):
-            self.lines.insert(index, Line(line, newline=self.lines[index].newline))
+        if index < 0:
+            index = max(index + self._length, 0)
+        if not isinstance(line, Line):
+            line = Line(line, newline=self._newline(index))
+        if index >= self._length:
+            self._insert(len(self._chunks) - 1, len(self._chunks[-1]), line)
+        else:
+            self._insert(*self._locate(index), line)
+
+    def _insert(self, chunk: int, offset: int, line: Line):
+        lines = self._chunks[chunk]
+        lines.insert(offset, line)
+        self._grow(chunk, 1)
+        if len(lines) > self.CHUNK_SIZE * 2:
+            half = len(lines) // 2
+            self._chunks[chunk : chunk + 1] = [
+                _Chunk(lines[:half]),
+                _Chunk(lines[half:]),
+            ]
+            self._rebuild()
+
+    def pop(self, index: int = -1) -> Line:
+        line = self[index]
+        del self[index]
+        return line
 
     def remove(self, line: SupportsStr | Line):
-        if isinstance(line, SupportsStr):
-            self.lines = [l for l in self.lines if l.line != line]
-        elif isinstance(line, Line):
-            self.lines = [l for l in self.lines if l.line != line.line]
+        text = line.line if isinstance(line, Line) else str(line)
+        self._load([l for l in self if l.line != text])
 
     def __str__(self) -> str:
-        return "".join([str(line) for line in self.lines])
+        strings: list[str] = []
+        for chunk in self._chunks:
+            if chunk.string is None:
+                # the lines drop the string when they change in place
+                ref = weakref.ref(chunk)
+                for line in chunk:
+                    line._watch(ref)
+                chunk.string = "".join([str(line) for line in chunk])
+            strings.append(chunk.string)
+        return "".join(strings)
 
     def __add__(self, other: "SupportsStr|Line|Multiline"):
         if isinstance(other, Line):
-            return Multiline(self.__str__() + str(other))
+            return Multiline.from_lines([*self, other])
+        elif isinstance(other, Multiline):
+            return Multiline.from_lines([*self, *other])
+        elif isinstance(other, SupportsStr):
+            return Multiline.from_lines(
+                [*self, *(Line(line) for line in str(other).splitlines())]
+            )
+
+    def __iadd__(self, other: "SupportsStr|Line|Multiline"):
+        if isinstance(other, Line):
+            self.append(other)
         elif isinstance(other, Multiline):
-            return Multiline(str(self) + str(other))
+            self.extend(list(other))
         elif isinstance(other, SupportsStr):
-            return Multiline(self.__str__() + str(other))
+            self.extend(Line(line) for line in str(other).splitlines())
+        return self
+
+
+class MultilineView(MutableSequence[Line]):
+    "the lines of a `Multiline` as a list, changes go to the multiline"
+
+    def __init__(self, multiline: Multiline) -> None:
+        self.multiline = multiline
+
+    def __len__(self) -> int:
+        return len(self.multiline)
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return list(self.multiline[index])
+        return self.multiline[index]
+
+    def __setitem__(self, index: int | slice, line: Any):
+        if isinstance(index, slice):
+            lines = list(self)
+            lines[index] = line
+            self.multiline.lines = lines
+        else:
+            self.multiline[index] = line
+
+    def __delitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            lines = list(self)
+            del lines[index]
+            self.multiline.lines = lines
+        else:
+            del self.multiline[index]
+
+    def insert(self, index: int, line: Any):
+        self.multiline.insert(index, line)
+
+    def sort(self, *, key: Callable[[Line], Any] | None = None, reverse: bool = False):
+        "sort the lines like `list.sort`"
+        self.multiline.lines = sorted(self, key=key, reverse=reverse)  # type: ignore
+
+    def copy(self) -> list[Line]:
+        return list(self)
+
+    def __eq__(self, other: object) -> bool:
+        return list(self) == other
+
+    def __repr__(self) -> str:
+        return repr(list(self))
 
 
 class Control:
@@ -523,14 +1315,15 @@ class Measurement:
         "the length of the text that will be shown to the user (excludes escape codes)"
         if isinstance(self.string, tuple):
             return self.string
-        ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-        stripped_text = ansi_escape.sub("", self.string)
-        l = stripped_text.splitlines()
-        if len(l) == 0:
-            max_columns = 0
-        else:
-            max_columns = max(len(line) for line in l)
-        return max_columns, len(l)
+        widths = measure(self.string)
+        return max(widths, default=0), len(widths)
+
+    @property
+    def widths(self) -> tuple[int, ...]:
+        "the visible width of every line"
+        if isinstance(self.string, tuple):
+            return (self.string[0],) * self.string[1]
+        return measure(self.string)
 
 
 @dataclass
@@ -547,7 +1340,6 @@ class ScrollableString:
     def __repr__(self):
         "'INS NOM [VIS] TRM'"
         self.string = str(self.string)
-        chars = list(self.string)
         start = self._position
         if start >= len(self.string):
             raise IndexError("start position bigger than string length")
@@ -556,9 +1348,8 @@ class ScrollableString:
         end = start + self.view_length
         if end > len(self.string):
             end = len(self.string) - 1
-        chars.insert(start, "[")
-        chars.insert(end + 1, "]")
-        return "'" + "".join(chars) + "'"
+        string = self.string
+        return "'" + string[:start] + "[" + string[start:end] + "]" + string[end:] + "'"
 
     def __str__(self) -> str:
         self.string = str(self.string)
@@ -573,6 +1364,104 @@ class ScrollableString:
         return self.string[start:end]
 
 
+class Viewport:
+    "a scrollable window over a large text (a string, a file or an mmap) that only reads the visible lines"
+
+    width: int
+    height: int
+    top: int
+    left: int
+
+    def __init__(
+        self,
+        source: str | bytes | Path | mmap.mmap,
+        *,
+        width: int,
+        height: int,
+        encoding: str = "utf-8",
+    ) -> None:
+        self.width = width
+        self.height = height
+        self.encoding = encoding
+        self.top = 0
+        self.left = 0
+        self._file = None
+        if isinstance(source, Path):
+            self._file = open(source, "rb")
+            if os.fstat(self._file.fileno()).st_size == 0:
+                source = b""
+            else:
+                source = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = source
+        self._newline = "\n" if isinstance(source, str) else b"\n"
+        # start offset of every line found so far, the index grows lazily
+        self._offsets = array("Q", [0])
+        self._complete = len(source) == 0
+
+    def _index_until(self, line: int | None = None):
+        data, newline, offsets = self._data, self._newline, self._offsets
+        while not self._complete and (line is None or len(offsets) <= line + 1):
+            position = data.find(newline, offsets[-1])  # type: ignore
+            if position == -1:
+                if offsets[-1] < len(data):
+                    offsets.append(len(data) + 1)
+                self._complete = True
+            else:
+                offsets.append(position + 1)
+                if position + 1 == len(data):
+                    self._complete = True
+
+    def index(self) -> "Viewport":
+        "index every line now, making any later jump O(1)"
+        self._index_until()
+        return self
+
+    @property
+    def line_count(self) -> int:
+        "the number of lines of the text (indexes the whole text)"
+        self._index_until()
+        return len(self._offsets) - 1
+
+    def line(self, number: int) -> str:
+        "a single line of the text without its line break"
+        self._index_until(number)
+        if number < 0 or number + 1 >= len(self._offsets):
+            raise IndexError("viewport line out of range")
+        text = self._data[self._offsets[number] : self._offsets[number + 1] - 1]
+        if isinstance(text, bytes):
+            text = text.decode(self.encoding, errors="replace")
+        return text.removesuffix("\r")
+
+    def scroll(self, columns: int = 0, lines: int = 0):
+        "scroll relative to the current position"
+        self.goto(self.top + lines, self.left + columns)
+
+    def goto(self, line: int, column: int = 0):
+        "move the window so `line` is the first visible line"
+        self._index_until(line)
+        self.top = max(min(line, len(self._offsets) - 2), 0)
+        self.left = max(column, 0)
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        if self._file:
+            self._file.close()
+
+    def __neon_measure__(self) -> tuple[int, int]:
+        return self.width, self.height
+
+    def __neon__(self):
+        self._index_until(self.top + self.height)
+        last = min(self.top + self.height, len(self._offsets) - 1)
+        for number in range(self.top, last):
+            yield self.line(number)[self.left : self.left + self.width]
+            yield "\n"
+
+    def __str__(self) -> str:
+        return str(useAutoRepr(self))
+
+
 @dataclass
 class Color:
     "stores real 256 color values"
@@ -615,6 +1504,151 @@ class Style:
     underline: Optional[bool] = None
     blink: Optional[bool] = None
 
+    def compile(self) -> tuple[str, str]:
+        "the escape prefix and reset pair of this style for the current terminal"
+        return compile_style(self)
+
+
+type ColorDepth = Literal["truecolor", "256", "16", "none"]
+
+# only what is compiled from a `Style` follows the color depth (colortext,
+# styletext, the progress bar), the built-in constants (BORDER_STYLE_*, the
+# default sparkline style) and the `fg`/`fx` based widgets are fixed 16 color
+# escapes made at import time, use `remove_effects` to strip them
+_color_depth: ColorDepth | None = None
+
+
+def detect_color_depth(stream: TextIO | None = None) -> ColorDepth:
+    "guess how many colors the terminal behind `stream` supports"
+    stream = stream or sys.stdout
+    environ = os.environ
+    if "NO_COLOR" in environ:
+        return "none"
+    if not environ.get("FORCE_COLOR") and not (
+        hasattr(stream, "isatty") and stream.isatty()
+    ):
+        return "none"
+    term = environ.get("TERM", "").lower()
+    if term == "dumb":
+        return "none"
+    if environ.get("COLORTERM", "").lower() in ("truecolor", "24bit"):
+        return "truecolor"
+    if "256" in term:
+        return "256"
+    if os.name == "nt":
+        return "truecolor"
+    return "16"
+
+
+def color_depth() -> ColorDepth:
+    "the color depth styles are compiled for (detected on first use)"
+    global _color_depth
+    if _color_depth is None:
+        _color_depth = detect_color_depth()
+    return _color_depth
+
+
+def set_color_depth(depth: ColorDepth | None):
+    "force a color depth (`None` detects it again) for the output compiled from a `Style`"
+    global _color_depth
+    _color_depth = depth
+    _compile_style.cache_clear()
+
+
+# channel value -> nearest level of the 6x6x6 cube of the 256 color palette
+_CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+_CUBE_INDEX = bytes(
+    min(range(6), key=lambda level: abs(_CUBE_LEVELS[level] - value))
+    for value in range(256)
+)
+
+
+_ANSI16_COLORS = (
+    (0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0),
+    (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+    (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0),
+    (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255),
+)  # fmt: skip
+
+
+@lru_cache(maxsize=None)
+def _cube_to_ansi16() -> bytes:
+    "cube cell -> nearest of the 16 basic colors (built on first use)"
+    return bytes(
+        min(
+            range(16),
+            key=lambda index: sum(
+                (a - b) ** 2
+                for a, b in zip(
+                    _ANSI16_COLORS[index],
+                    (
+                        _CUBE_LEVELS[cell // 36],
+                        _CUBE_LEVELS[cell // 6 % 6],
+                        _CUBE_LEVELS[cell % 6],
+                    ),
+                )
+            ),
+        )
+        for cell in range(216)
+    )
+
+
+def _color_code(rgb: tuple[int, int, int], background: bool, depth: ColorDepth) -> str:
+    red, green, blue = rgb
+    if depth == "truecolor":
+        return f"{48 if background else 38};2;{red};{green};{blue}"
+    cell = _CUBE_INDEX[red] * 36 + _CUBE_INDEX[green] * 6 + _CUBE_INDEX[blue]
+    if depth == "256":
+        if red == green == blue:
+            # the grey ramp is finer than the grey diagonal of the cube
+            gray = 16 + cell if red < 4 or red > 246 else 232 + (red - 4) // 10
+            return f"{48 if background else 38};5;{min(gray, 255)}"
+        return f"{48 if background else 38};5;{16 + cell}"
+    index = _cube_to_ansi16()[cell]
+    if index < 8:
+        return str((40 if background else 30) + index)
+    return str((100 if background else 90) + index - 8)
+
+
+@lru_cache(maxsize=1024)
+def _compile_style(
+    foreground: tuple[int, int, int] | None,
+    background: tuple[int, int, int] | None,
+    effects: tuple[bool, bool, bool, bool],
+    depth: ColorDepth,
+) -> tuple[str, str]:
+    if depth == "none":
+        return "", ""
+    codes = [code for code, on in zip(("1", "3", "4", "5"), effects) if on]
+    if foreground:
+        codes.append(_color_code(foreground, False, depth))
+    if background:
+        codes.append(_color_code(background, True, depth))
+    if not codes:
+        return "", ""
+    return sys.intern(f"\x1b[{';'.join(codes)}m"), "\x1b[0m"
+
+
+def compile_style(
+    style: Style, *, colors: bool = True, effects: bool = True
+) -> tuple[str, str]:
+    "compile a style into an escape prefix and reset pair, cached by the value of the style"
+    return _compile_style(
+        style.foreground.rgb if colors and style.foreground else None,
+        style.background.rgb if colors and style.background else None,
+        (
+            (
+                bool(style.bold),
+                bool(style.italic),
+                bool(style.underline),
+                bool(style.blink),
+            )
+            if effects
+            else (False, False, False, False)
+        ),
+        color_depth(),
+    )
+
 
 def border(
     string: SupportsStr,
@@ -629,17 +1663,16 @@ def border(
     string = str(string)
     lines = string.splitlines()
 
-    m = Measurement(string)
-    max_width = m.visible[0]
+    widths = measure(string)
+    max_width = max(widths, default=0)
 
     border_top = corners[0] + (horizontal[0] * max_width) + corners[1]
     border_bottom = corners[2] + (horizontal[1] * max_width) + corners[3]
 
     bordered_lines: list[str] = [border_top]
-    for line in lines:
-        m = Measurement(line)
+    for line, width in zip(lines, widths):
         bordered_lines.append(
-            f"{vertical[0]}{line}{' '*((max_width)-m.visible[0])}{vertical[1]}"
+            f"{vertical[0]}{line}{' '*((max_width)-width)}{vertical[1]}"
         )
     bordered_lines.append(border_bottom)
 
@@ -653,9 +1686,10 @@ def padding(
 ) -> str:
     "add padding to the string"
     # Split the input into lines
-    lines = str(string).splitlines()
-    m = Measurement(string)
-    max_width = m.visible[0]
+    string = str(string)
+    lines = string.splitlines()
+    widths = measure(string)
+    max_width = max(widths, default=0)
     if (style) and (style.padding):
         left, bottom, top, right = style.padding
     else:
@@ -663,8 +1697,8 @@ def padding(
 
     # Add left and right padding to each line
     padded_lines = [
-        f"{' ' * left}{line}{' ' * (right + max_width - len(stripped_line))}"
-        for line, stripped_line in zip(lines, str(string).splitlines())
+        f"{' ' * left}{line}{' ' * (right + max_width - width)}"
+        for line, width in zip(lines, widths)
     ]
 
     # Add top and bottom padding
@@ -678,26 +1712,14 @@ def padding(
 
 def colortext(content: SupportsStr, style: Style, *, reset: bool = True) -> str:
     "add color to the string"
-    codes = []
-    if isinstance(style.foreground, Color):
-        codes.append(rgb256(*style.foreground.rgb))
-    if isinstance(style.background, Color):
-        codes.append(rgb256(*style.background.rgb, bg=True))
-
-    return forge((str(Control(codes)), str(content))) + ("\x1b[0m" if reset else "")
+    prefix, end = compile_style(style, effects=False)
+    return prefix + str(content) + (end if reset else "")
 
 
 def styletext(content: SupportsStr, style: Style, *, reset: bool = True) -> str:
     "add style and effects to the string"
-    codes = []
-    if isinstance(style.bold, bool):
-        codes.append(fx.bold("", reset=False))
-    if isinstance(style.italic, bool):
-        codes.append(fx.italic("", reset=False))
-    if isinstance(style.blink, bool):
-        codes.append(fx.blink("", reset=False))
-
-    return forge((str(Control(codes)), str(content))) + ("\x1b[0m" if reset else "")
+    prefix, end = compile_style(style, colors=False)
+    return prefix + str(content) + (end if reset else "")
 
 
 class Projection:
@@ -730,8 +1752,13 @@ class Projection:
                 yield cell
             yield "\n"
 
+    def __neon_write__(self, sink: SupportsWrite):
+        for row in self.content:
+            sink.write("".join(row))
+            sink.write("\n")
+
     def __str__(self) -> str:
-        return str(useAutoRepr(self))
+        return _render(self)
 
     def __repr__(self) -> str:
         return f"Projection(width={self.width}, height={self.height})"
@@ -746,66 +1773,585 @@ def rem(value: int | float) -> int | float:
     return value * 16
 
 
+class InternTable:
+    "interns strings into small integer indexes so cells can be stored as numbers"
+
+    values: list[str]
+    indexes: dict[str, int]
+
+    def __init__(self, *initial: str) -> None:
+        self.values = []
+        self.indexes = {}
+        for value in initial:
+            self.intern(value)
+
+    def intern(self, value: str) -> int:
+        "return the index of `value`, adding it to the table if it is new"
+        index = self.indexes.get(value)
+        if index is None:
+            index = len(self.values)
+            self.values.append(value)
+            self.indexes[value] = index
+        return index
+
+    def __getitem__(self, index: int) -> str:
+        return self.values[index]
+
+    def __len__(self):
+        return len(self.values)
+
+
+# every glyph table starts with these two, so they have the same index everywhere
+_BLANK = 0
+# the empty glyph fills the second cell of a wide glyph
+_CONTINUATION = 1
+
+
+def _glyph_table() -> InternTable:
+    return InternTable(" ", "")
+
+
+class Sprite:
+    "a renderable tokenized once into glyph/style cells, ready to be projected many times"
+
+    width: int
+    height: int
+    glyphs: InternTable
+    styles: InternTable
+    glyph_rows: list[array]
+    style_rows: list[array]
+
+    def __init__(
+        self,
+        content: SupportsStr,
+        *,
+        glyphs: InternTable | None = None,
+        styles: InternTable | None = None,
+    ) -> None:
+        # the tables of the canvas the sprite is made for, when there is one
+        self.glyphs = _glyph_table() if glyphs is None else glyphs
+        self.styles = InternTable("") if styles is None else styles
+        self.glyph_rows = []
+        self.style_rows = []
+        glyph_index, style_index = self.glyphs.intern, self.styles.intern
+        style = ""
+        for line in str(content).splitlines():
+            glyphs, styles = array("I"), array("I")
+            current = style_index(style)
+            for token in _SPAN_TOKENS.findall(line):
+                if token[0] != "\x1b":
+                    if token.isascii():
+                        glyphs.extend(map(glyph_index, token))
+                        styles.fromlist([current] * len(token))
+                    else:
+                        self._extend(glyphs, styles, token, current)
+                elif token[-1] == "m":
+                    # styles carry over to the next lines, like on a terminal
+                    style = _apply_sgr(style, token)
+                    current = style_index(style)
+            self.glyph_rows.append(glyphs)
+            self.style_rows.append(styles)
+        self.width = max(map(len, self.glyph_rows), default=0)
+        self.height = len(self.glyph_rows)
+
+    def _extend(self, glyphs: array, styles: array, text: str, style: int):
+        "append non-ascii text, wide glyphs take a second empty cell and combining marks join the glyph before them"
+        table = self.glyphs
+        for char in text:
+            width = charwidth(char)
+            if width == 0 and glyphs:
+                index = len(glyphs) - 1
+                if index > 0 and glyphs[index] == _CONTINUATION:
+                    index -= 1
+                glyphs[index] = table.intern(table[glyphs[index]] + char)
+                continue
+            glyphs.append(table.intern(char if width else " " + char))
+            styles.append(style)
+            if width == 2:
+                glyphs.append(_CONTINUATION)
+                styles.append(style)
+
+    def __neon_measure__(self) -> tuple[int, int]:
+        return self.width, self.height
+
+    def __repr__(self) -> str:
+        return f"Sprite(width={self.width}, height={self.height})"
+
+
+def _remap(cells: array, mapping: list[int] | None) -> array:
+    return cells if mapping is None else array("I", map(mapping.__getitem__, cells))
+
+
 class Canvas:
     "a pre-allocated 2D buffer for multi-layer string editing"
 
     width: int
     height: int
-    buff: list[list[Character]]
+    filler: str
+    glyphs: InternTable
+    styles: InternTable
+    glyph_rows: list[array]
+    style_rows: list[array]
 
     def __init__(self, width: int, height: int, filler: str = " ") -> None:
         self.width = width
         self.height = height
-        self.buff = [
-            [Character(filler) for _ in range(self.width)] for _ in range(self.height)
+        self.filler = filler
+        # the cells index these tables, they are emptied by `clear` and
+        # compacted when they grow much larger than the canvas
+        self.glyphs = _glyph_table()
+        self.styles = InternTable("")
+        filler_index = self.glyphs.intern(filler)
+        self.glyph_rows = [self._blank(filler_index) for _ in range(height)]
+        self.style_rows = [self._blank(0) for _ in range(height)]
+
+    def _blank(self, value: int, width: int | None = None) -> array:
+        return array("I", [value]) * (self.width if width is None else width)
+
+    @property
+    def buff(self) -> list[list[Character]]:
+        "a snapshot of the canvas as `Character` objects (slow, kept for compatibility)"
+        return [
+            [Character(self.glyphs[index], strip=False) for index in row]
+            for row in self.glyph_rows
         ]
 
     def recalculate_buffer_length(self):
         "Recalculate the length of the buffer to match the width of the canvas"
-        if self.height > len(self.buff):
-            for _ in range(len(self.buff), self.height):
-                self.buff.append([Character(" ") for _ in range(self.width)])
-        elif self.height < len(self.buff):
-            self.buff = self.buff[: self.height]
-
-        for row in self.buff:
-            if self.width > len(row):
-                row.extend([Character(" ") for _ in range(len(row), self.width)])
-            elif self.width < len(row):
-                row[:] = row[: self.width]
-
-    def setcol(self, char: str, row: int, col: int):
+        filler = self.glyphs.intern(self.filler)
+        if self.height > len(self.glyph_rows):
+            for _ in range(len(self.glyph_rows), self.height):
+                self.glyph_rows.append(self._blank(filler))
+                self.style_rows.append(self._blank(0))
+        elif self.height < len(self.glyph_rows):
+            del self.glyph_rows[self.height :]
+            del self.style_rows[self.height :]
+
+        for glyphs, styles in zip(self.glyph_rows, self.style_rows):
+            if self.width > len(glyphs):
+                glyphs.extend(self._blank(filler, self.width - len(glyphs)))
+                styles.extend(self._blank(0, self.width - len(styles)))
+            elif self.width < len(glyphs):
+                del glyphs[self.width :]
+                del styles[self.width :]
+
+    def setcol(self, char: str, row: int, col: int, *, style: SupportsStr = ""):
         if (row < 0) or (row >= self.height) or (col < 0) or (col >= self.width):
             raise IndexError(
                 f"Character position ({row}, {col}) exceeds buffer dimensions ({self.height}, {self.width})"
             )
-        self.buff[row][col] = Character(char, strip=not isEscapeCode(char))
-
-    def project(self, content: SupportsStr, *, x: int = 0, y: int = 0):
-        "project a string onto the canvas at the specified position"
-        # TODO: this code is so problematic i can't even begin to explain why
-        # TODO: please fix this for god sake
-        content = str(content)
-        for i, row in enumerate(content.splitlines()):
-            for j, char in enumerate(splitchar(row)):
-                if (
-                    (i + y < 0)
-                    or (i + y >= self.height)
-                    or (j + x < 0)
-                    or (j + x >= self.width)
-                ):
-                    raise IndexError(
-                        f"Character position ({i + y}, {j + x}) exceeds buffer dimensions ({self.height}, {self.width})"
-                    )
-                self.setcol(char, i + y, j + x)
+        self.glyph_rows[row][col] = self.glyphs.intern(
+            char if isEscapeCode(char) else char[:1]
+        )
+        self.style_rows[row][col] = self.styles.intern(str(style))
+        self._compact_if_needed()
+
+    def compact(self):
+        "drop the glyphs and styles no cell uses anymore, renumbering the cells"
+        for name, rows, initial in (
+            ("glyphs", self.glyph_rows, 2),
+            ("styles", self.style_rows, 1),
+        ):
+            old: InternTable = getattr(self, name)
+            table = InternTable(*old.values[:initial])
+            used: set[int] = set()
+            for row in rows:
+                used.update(row)
+            mapping = list(range(len(old)))
+            for index in sorted(used):
+                mapping[index] = table.intern(old[index])
+            for row in rows:
+                row[:] = array("I", map(mapping.__getitem__, row))
+            setattr(self, name, table)
+
+    def _compact_if_needed(self):
+        limit = 1024 + 2 * self.width * self.height
+        if len(self.glyphs) > limit or len(self.styles) > limit:
+            self.compact()
+
+    def _paste(self, row: int, start: int, glyphs: array, styles: array, cut: bool):
+        "write cells into a row, blanking wide glyphs that end up cut in half (`cut` when the last glyph lost its second cell)"
+        target = self.glyph_rows[row]
+        end = start + len(glyphs)
+        split_left = start > 0 and target[start] == _CONTINUATION
+        split_right = end < self.width and target[end] == _CONTINUATION
+        target[start:end] = glyphs
+        self.style_rows[row][start:end] = styles
+        if split_left:
+            target[start - 1] = _BLANK
+        if split_right:
+            target[end] = _BLANK
+        if target[start] == _CONTINUATION:
+            target[start] = _BLANK
+        if cut:
+            target[end - 1] = _BLANK
+
+    def getcol(self, row: int, col: int) -> tuple[str, str]:
+        "returns the glyph and the style stored at the position"
+        return (
+            self.glyphs[self.glyph_rows[row][col]],
+            self.styles[self.style_rows[row][col]],
+        )
+
+    def fill(
+        self,
+        char: str = " ",
+        *,
+        x: int = 0,
+        y: int = 0,
+        width: int | None = None,
+        height: int | None = None,
+        style: SupportsStr = "",
+    ):
+        "fill a rectangle of the canvas with a character (clipped to the canvas)"
+        width = self.width - x if width is None else width
+        height = self.height - y if height is None else height
+        start, end = max(x, 0), min(x + width, self.width)
+        if start >= end:
+            return
+        glyph = self._blank(self.glyphs.intern(char[:1]), end - start)
+        styled = self._blank(self.styles.intern(str(style)), end - start)
+        for row in range(max(y, 0), min(y + height, self.height)):
+            self._paste(row, start, glyph, styled, False)
+        self._compact_if_needed()
+
+    def clear(self):
+        "reset every cell to the filler character, forgetting every glyph and style"
+        self.glyphs = _glyph_table()
+        self.styles = InternTable("")
+        filler = self._blank(self.glyphs.intern(self.filler))
+        blank = self._blank(0)
+        for glyphs, styles in zip(self.glyph_rows, self.style_rows):
+            glyphs[:] = filler
+            styles[:] = blank
+
+    def _mappings(self, glyphs: InternTable, styles: InternTable) -> tuple:
+        "translate the indexes of other tables into the tables of this canvas (None when they are the same)"
+        if glyphs is self.glyphs and styles is self.styles:
+            return None, None
+        return (
+            list(map(self.glyphs.intern, glyphs.values)),
+            list(map(self.styles.intern, styles.values)),
+        )
+
+    def copy_row(self, source: int, target: int):
+        "copy a whole row of the canvas over another row"
+        self.glyph_rows[target][:] = self.glyph_rows[source]
+        self.style_rows[target][:] = self.style_rows[source]
+
+    def blit(
+        self, source: "Canvas", *, x: int = 0, y: int = 0, region: "rect | None" = None
+    ):
+        "copy a region of another canvas onto this canvas at the specified position"
+        if region is None:
+            region = rect(source.width, source.height, 0, 0)
+        # clip the region against both the source and the target canvas
+        left = max(region.x, 0, region.x - x)
+        right = min(region.x + region.width, source.width, region.x + self.width - x)
+        if left >= right:
+            return
+        start = x + (left - region.x)
+        top = max(region.y, 0, region.y - y)
+        bottom = min(
+            region.y + region.height, source.height, region.y + self.height - y
+        )
+        glyph_map, style_map = self._mappings(source.glyphs, source.styles)
+        for row in range(top, bottom):
+            glyphs = source.glyph_rows[row]
+            self._paste(
+                y + (row - region.y),
+                start,
+                _remap(glyphs[left:right], glyph_map),
+                _remap(source.style_rows[row][left:right], style_map),
+                right < source.width and glyphs[right] == _CONTINUATION,
+            )
+        self._compact_if_needed()
+
+    def project(
+        self,
+        content: "SupportsStr | Sprite",
+        *,
+        x: int = 0,
+        y: int = 0,
+        width: int | None = None,
+        height: int | None = None,
+    ):
+        "project a string (or a pre-tokenized `Sprite`) onto the canvas, clipping what falls outside (or outside `width`x`height`)"
+        if isinstance(content, Sprite):
+            sprite = content
+        else:
+            sprite = Sprite(content, glyphs=self.glyphs, styles=self.styles)
+        glyph_map, style_map = self._mappings(sprite.glyphs, sprite.styles)
+        limit_x = self.width if width is None else min(self.width, x + width)
+        limit_y = self.height if height is None else min(self.height, y + height)
+        top, bottom = max(0, -y), min(sprite.height, limit_y - y)
+        for row in range(top, bottom):
+            glyphs = sprite.glyph_rows[row]
+            left, right = max(0, -x), min(len(glyphs), limit_x - x)
+            if left >= right:
+                continue
+            self._paste(
+                y + row,
+                x + left,
+                _remap(glyphs[left:right], glyph_map),
+                _remap(sprite.style_rows[row][left:right], style_map),
+                right < len(glyphs) and glyphs[right] == _CONTINUATION,
+            )
+        self._compact_if_needed()
 
     def render(self) -> Projection:
         "render the canvas to a projection"
-        return Projection(
-            content=[[c.char for c in row] for row in self.buff],
-            width=self.width,
-            height=self.height,
+        glyphs, styles = self.glyphs.values, self.styles.values
+        content: list[list[str]] = []
+        for glyph_row, style_row in zip(self.glyph_rows, self.style_rows):
+            row = list(map(glyphs.__getitem__, glyph_row))
+            if style_row.count(0) != len(style_row):
+                # wrap every run of equally styled cells in a single escape code
+                current = 0
+                for col, style in enumerate(style_row):
+                    if style != current:
+                        prefix = "\x1b[0m" if current else ""
+                        row[col] = prefix + styles[style] + row[col]
+                        current = style
+                if current:
+                    row[-1] += "\x1b[0m"
+            content.append(row)
+        return Projection(content=content, width=self.width, height=self.height)
+
+
+@dataclass
+class FlushPolicy:
+    "decides when buffered terminal output is flushed"
+
+    mode: Literal["always", "line", "size", "time"] = "always"
+    size: int = 8192
+    interval: float = 0.05
+
+
+class TerminalFrame(NamedTuple):
+    "what was sent to a `VirtualTerminal` between two flushes"
+
+    bytes: int
+    writes: int
+
+
+_TERMINAL_TOKENS = re.compile(
+    r"\x1b\[([0-?]*)[ -/]*([@-~])|\x1b\]([^\x07\x1b]*)(?:\x07|\x1b\\)|\x1b([@-Z\\-_78])|([^\x1b]+)"
+)
+_INCOMPLETE_ESCAPE = re.compile(r"\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*)?$")
+
+
+class VirtualTerminal:
+    """
+    an in-memory terminal emulator to be used as the output of a `TerminalDriver`,
+    it applies cursor movements, erases and SGR codes to a grid of cells and
+    counts the bytes, writes and flushes it receives, so rendering can be
+    measured and checked without a tty
+    """
+
+    def __init__(self, columns: int = 80, lines: int = 24) -> None:
+        self.size = os.terminal_size((columns, lines))
+        self.canvas = Canvas(columns, lines)
+        self.row = 0
+        self.col = 0
+        self.style = ""
+        self.title = ""
+        self.modes: set[str] = set()
+        self.input = ""
+        self._saved = (0, 0, "")
+        self._pending = ""
+        self.reset_stats()
+
+    def reset_stats(self):
+        "forget the counted bytes, writes, flushes and frames"
+        self.bytes = 0
+        self.writes = 0
+        self.flushes = 0
+        self.frames: list[TerminalFrame] = []
+        self._frame = TerminalFrame(0, 0)
+
+    def write(self, data: str) -> int:
+        size = len(data.encode())
+        self.bytes += size
+        self.writes += 1
+        self._frame = TerminalFrame(self._frame.bytes + size, self._frame.writes + 1)
+        self._feed(self._pending + data)
+        self.canvas._compact_if_needed()
+        return len(data)
+
+    def flush(self):
+        self.flushes += 1
+        if self._frame.writes:
+            self.frames.append(self._frame)
+            self._frame = TerminalFrame(0, 0)
+
+    def read(self) -> str:
+        "the input queued with `feed`"
+        data, self.input = self.input, ""
+        return data
+
+    def feed(self, data: str):
+        "queue input for the next `read`"
+        self.input += data
+
+    def isatty(self) -> bool:
+        return False
+
+    def fileno(self) -> int:
+        raise UnsupportedOperation("a virtual terminal has no file descriptor")
+
+    def resize(self, columns: int, lines: int):
+        self.size = os.terminal_size((columns, lines))
+        self.canvas.width, self.canvas.height = columns, lines
+        self.canvas.recalculate_buffer_length()
+        self.row = min(self.row, lines - 1)
+        self.col = min(self.col, columns)
+
+    @property
+    def lines(self) -> list[str]:
+        "the text on the screen, one string per row without trailing spaces"
+        return [
+            "".join(map(self.canvas.glyphs.values.__getitem__, row)).rstrip()
+            for row in self.canvas.glyph_rows
+        ]
+
+    @property
+    def display(self) -> str:
+        "the text on the screen without the empty rows at the bottom"
+        return "\n".join(self.lines).rstrip("\n")
+
+    def cell(self, row: int, col: int) -> tuple[str, str]:
+        "the glyph and the style of a cell"
+        return self.canvas.getcol(row, col)
+
+    def _feed(self, data: str):
+        # an escape code cut in half by the writer is finished by the next write
+        incomplete = _INCOMPLETE_ESCAPE.search(data)
+        self._pending = incomplete.group() if incomplete else ""
+        if incomplete:
+            data = data[: incomplete.start()]
+        for match in _TERMINAL_TOKENS.finditer(data):
+            params, command, title, escape, text = match.groups()
+            if text is not None:
+                self._text(text)
+            elif command is not None:
+                self._csi(params, command)
+            elif title is not None:
+                self.title = title.partition(";")[2]
+            elif escape == "7":
+                self._saved = (self.row, self.col, self.style)
+            elif escape == "8":
+                self.row, self.col, self.style = self._saved
+
+    def _linefeed(self):
+        if self.row + 1 < self.size.lines:
+            self.row += 1
+            return
+        # scroll the screen up by one row
+        canvas = self.canvas
+        del canvas.glyph_rows[0], canvas.style_rows[0]
+        canvas.glyph_rows.append(canvas._blank(canvas.glyphs.intern(canvas.filler)))
+        canvas.style_rows.append(canvas._blank(0))
+
+    def _put(self, glyph: str, width: int):
+        if self.col + width > self.size.columns:
+            self.col = 0
+            self._linefeed()
+        style = self.canvas.styles.intern(self.style)
+        glyphs, styles = (
+            self.canvas.glyph_rows[self.row],
+            self.canvas.style_rows[self.row],
         )
+        glyphs[self.col], styles[self.col] = self.canvas.glyphs.intern(glyph), style
+        if width == 2:
+            glyphs[self.col + 1], styles[self.col + 1] = _CONTINUATION, style
+        self.col += width
+
+    def _text(self, text: str):
+        for char in text:
+            if char == "\n":
+                # like a tty with onlcr, a line feed also returns the carriage
+                self.col = 0
+                self._linefeed()
+            elif char == "\r":
+                self.col = 0
+            elif char == "\b":
+                self.col = max(self.col - 1, 0)
+            elif char == "\t":
+                self.col = min((self.col // 8 + 1) * 8, self.size.columns - 1)
+            elif char < " " or char == "\x7f":
+                continue
+            elif (width := charwidth(char)) == 0:
+                if self.col > 0:
+                    row, col = self.row, self.col - 1
+                    glyphs = self.canvas.glyph_rows[row]
+                    if col > 0 and glyphs[col] == _CONTINUATION:
+                        col -= 1
+                    table = self.canvas.glyphs
+                    glyphs[col] = table.intern(table[glyphs[col]] + char)
+            else:
+                self._put(char, width)
+
+    def _erase(self, row: int, start: int, end: int):
+        blank = self.canvas.glyphs.intern(self.canvas.filler)
+        for col in range(max(start, 0), min(end, self.size.columns)):
+            self.canvas.glyph_rows[row][col] = blank
+            self.canvas.style_rows[row][col] = 0
+
+    def _csi(self, params: str, command: str):
+        if params.startswith("?"):
+            # private modes (synchronized output, cursor visibility, alternative screen)
+            if command == "h":
+                self.modes.add(params)
+            elif command == "l":
+                self.modes.discard(params)
+            return
+        numbers = [int(value) if value.isdigit() else 0 for value in params.split(";")]
+        amount = max(numbers[0], 1)
+        columns, lines = self.size
+        match command:
+            case "A":
+                self.row = max(self.row - amount, 0)
+            case "B":
+                self.row = min(self.row + amount, lines - 1)
+            case "C":
+                self.col = min(self.col + amount, columns - 1)
+            case "D":
+                self.col = max(min(self.col, columns - 1) - amount, 0)
+            case "E" | "F":
+                self.col = 0
+                self.row = max(
+                    min(self.row + (amount if command == "E" else -amount), lines - 1),
+                    0,
+                )
+            case "G":
+                self.col = min(amount, columns) - 1
+            case "H" | "f":
+                column = max(numbers[1], 1) if len(numbers) > 1 else 1
+                self.row, self.col = min(amount, lines) - 1, min(column, columns) - 1
+            case "K":
+                start, end = {0: (self.col, columns), 1: (0, self.col + 1)}.get(
+                    numbers[0], (0, columns)
+                )
+                self._erase(self.row, start, end)
+            case "J":
+                if numbers[0] == 0:
+                    self._erase(self.row, self.col, columns)
+                    rows = range(self.row + 1, lines)
+                elif numbers[0] == 1:
+                    self._erase(self.row, 0, self.col + 1)
+                    rows = range(0, self.row)
+                else:
+                    rows = range(lines)
+                for row in rows:
+                    self._erase(row, 0, columns)
+            case "m":
+                # folded so equal looking cells store equal styles
+                self.style = _apply_sgr(self.style, f"\x1b[{params}m")
+            case "s":
+                self._saved = (self.row, self.col, self.style)
+            case "u":
+                self.row, self.col, self.style = self._saved
 
 
 class TerminalDriver:
@@ -815,15 +2361,84 @@ class TerminalDriver:
     _stdin = sys.stdin
     _stderr = sys.stderr
 
-    @property
-    def width(self) -> int:
-        "the width of the terminal"
-        return get_terminal_size().columns
+    def __init__(
+        self,
+        *,
+        buffered: bool = False,
+        synchronized: bool = False,
+        policy: FlushPolicy | None = None,
+        stdout: "TextIO | VirtualTerminal | None" = None,
+        stdin: "TextIO | VirtualTerminal | None" = None,
+    ) -> None:
+        if stdout is not None:
+            self._stdout = stdout
+        if stdin is not None:
+            self._stdin = stdin
+        self.synchronized = synchronized
+        self.policy = policy or FlushPolicy("size" if buffered else "always")
+        self._buffer: list[str] = []
+        self._buffered_size = 0
+        self._frames = 0
+        self._frame_start = 0
+        self._timer: threading.Timer | None = None
+        self._buffer_lock = threading.RLock()
+
+    # the terminal size is cached until SIGWINCH reports a resize, where the
+    # signal is not available (or another handler replaced ours) it is
+    # queried on every access instead
+    _size: os.terminal_size | None = None
+    _watching_resize: bool | None = None
+    _resize_handler: Callable[[int, Any], None] | None = None
 
-    @property
-    def height(self) -> int:
-        "the height of the terminal"
-        return get_terminal_size().lines
+    @classmethod
+    def _watch_resize(cls):
+        if threading.current_thread() is not threading.main_thread():
+            # handlers can only be installed from the main thread, stay
+            # undecided so its next access installs one
+            return
+        cls._watching_resize = False
+        if not hasattr(signal, "SIGWINCH"):
+            return
+        previous = signal.getsignal(signal.SIGWINCH)
+
+        def resized(signum, frame):
+            cls._size = None
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(signal.SIGWINCH, resized)
+        cls._resize_handler = resized
+        cls._watching_resize = True
+
+    @property
+    def size(self) -> os.terminal_size:
+        "the size of the terminal"
+        if isinstance(self._stdout, VirtualTerminal):
+            return self._stdout.size
+        cls = TerminalDriver
+        if cls._watching_resize is None:
+            cls._watch_resize()
+        # an application handler installed later would leave the cache stale
+        watching = (
+            cls._watching_resize
+            and signal.getsignal(signal.SIGWINCH) is cls._resize_handler
+        )
+        size = cls._size if watching else None
+        if size is None:
+            size = get_terminal_size()
+            if watching:
+                cls._size = size
+        return size
+
+    @property
+    def width(self) -> int:
+        "the width of the terminal"
+        return self.size.columns
+
+    @property
+    def height(self) -> int:
+        "the height of the terminal"
+        return self.size.lines
 
     @property
     def fhandle(self) -> tuple[int, int, int]:
@@ -832,6 +2447,9 @@ class TerminalDriver:
 
     def clear(self):
         "clear the terminal screen"
+        if isinstance(self._stdout, VirtualTerminal):
+            self.stdout("\033[2J\033[H")
+            return
         system("cls" if os.name == "nt" else "clear")
 
     def settitle(self, title: SupportsStr):
@@ -885,8 +2503,82 @@ class TerminalDriver:
         self.stdout(f"\033[{prefix}{value}{';'.join(params)}{suffix}")
 
     def stdout(self, data: SupportsStr):
-        self._stdout.write(str(data))
-        sys.stdout.flush()
+        data = str(data)
+        with self._buffer_lock:
+            if self._frames == 0 and self.policy.mode == "always":
+                self._stdout.write(data)
+                self._stdout.flush()
+                return
+            self._buffer.append(data)
+            self._buffered_size += len(data)
+            if self._frames == 0:
+                self._apply_policy(data)
+
+    def write(self, data: SupportsStr):
+        "file-like alias of `stdout` so the driver can be used as a render sink"
+        self.stdout(data)
+
+    def _apply_policy(self, data: str):
+        match self.policy.mode:
+            case "line":
+                if "\n" in data:
+                    self.flush()
+            case "size":
+                if self._buffered_size >= self.policy.size:
+                    self.flush()
+            case "time":
+                if self._timer is None:
+                    self._timer = threading.Timer(self.policy.interval, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def flush(self):
+        "write everything that is buffered with a single write call"
+        with self._buffer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._buffer:
+                return
+            data = "".join(self._buffer)
+            self._buffer.clear()
+            self._buffered_size = 0
+            self._stdout.write(data)
+            self._stdout.flush()
+
+    def begin(self):
+        "start a frame, all output is held back until the matching `commit`"
+        with self._buffer_lock:
+            if self._frames == 0:
+                self._frame_start = len(self._buffer)
+                if self.synchronized:
+                    self._buffer.append("\033[?2026h")
+            self._frames += 1
+
+    def commit(self):
+        "end a frame and emit it with a single write"
+        with self._buffer_lock:
+            if self._frames == 0:
+                raise RuntimeError("commit() called without a matching begin()")
+            self._frames -= 1
+            if self._frames > 0:
+                return
+            if self.synchronized:
+                if len(self._buffer) == self._frame_start + 1:
+                    # nothing was drawn, drop the empty synchronized update
+                    self._buffer.pop()
+                else:
+                    self._buffer.append("\033[?2026l")
+            self.flush()
+
+    @contextmanager
+    def frame(self):
+        "a block whose output is written to the terminal at once"
+        self.begin()
+        try:
+            yield self
+        finally:
+            self.commit()
 
     def stderr(self, data: SupportsStr):
         self._stderr.write(str(data))
@@ -910,6 +2602,8 @@ class ProgressBar:
         self.completed = completed
         self.width = width
         self.bar_style = bar_style
+        self._cells: tuple[BarStyle | None, ColorDepth, str, str, str] | None = None
+        self._rendered: tuple[tuple, str] | None = None
 
     def update(self, value: int):
         if self.completed == self.total:
@@ -919,28 +2613,55 @@ class ProgressBar:
     def reset(self):
         self.completed = 0
 
+    @property
+    def steps(self) -> int:
+        "how many different fill levels the bar can show"
+        return self.width + 1
+
+    @property
+    def filled(self) -> int:
+        "the number of filled cells"
+        return (self.completed * (self.width + 1)) // self.total
+
+    def _colored_cells(self) -> tuple[str, str, str]:
+        # compiled for the color depth, `set_color_depth` recompiles them
+        depth = color_depth()
+        cells = self._cells
+        if cells is None or cells[0] is not self.bar_style or cells[1] != depth:
+            if self.bar_style:
+                off_code = self.bar_style[1]
+                on_code = self.bar_style[2]
+                end_code = self.bar_style[3]
+                unfinished, finished = self.bar_style[0]
+            else:
+                off_code = Color(33, 33, 33, 1)
+                on_code = Color(232, 16, 81, 1)
+                end_code = Color(124, 232, 16, 1)
+                unfinished, finished = ("━", "━")
+            self._cells = (
+                self.bar_style,
+                depth,
+                colortext(unfinished, style=Style(foreground=off_code)),
+                colortext(finished, style=Style(foreground=on_code)),
+                colortext(finished, style=Style(foreground=end_code)),
+            )
+        return self._cells[2:]
+
     def __str__(self) -> str:
-        content = ""
-        if self.bar_style:
-            off_code = self.bar_style[1]
-            on_code = self.bar_style[2]
-            end_code = self.bar_style[3]
-            unfinished, finished = self.bar_style[0]
-        else:
-            off_code = Color(33, 33, 33, 1)
-            on_code = Color(232, 16, 81, 1)
-            end_code = Color(124, 232, 16, 1)
-            unfinished, finished = ("━", "━")
-        on_style = Style(foreground=on_code)
-        off_style = Style(foreground=off_code)
-        end_style = Style(foreground=end_code)
-        number = (self.completed * (self.width + 1)) // self.total
-        off = colortext(unfinished, style=off_style)
-        on = colortext(finished, style=on_style)
-        if self.completed >= self.total:
-            on = colortext(finished, style=end_style)
-        content += f"{on * number}{off * (self.width - number)}"
-        return content
+        number = self.filled
+        state = (
+            number,
+            self.width,
+            self.completed >= self.total,
+            self.bar_style,
+            color_depth(),
+        )
+        if self._rendered is None or self._rendered[0] != state:
+            off, on, end = self._colored_cells()
+            if state[2]:
+                on = end
+            self._rendered = (state, f"{on * number}{off * (self.width - number)}")
+        return self._rendered[1]
 
 
 class Animation:
@@ -967,73 +2688,291 @@ class Animation:
         return str(self.frames[self.index])
 
 
-class Live:
-    "live display content using threads"
+class DiffRenderer:
+    "double-buffered renderer that only redraws the cells that changed since the last frame"
+
+    previous: list[list[tuple[str, str]]]
+
+    def __init__(self, driver: "TerminalDriver | None" = None) -> None:
+        self.driver = driver or TerminalDriver()
+        self.reset()
+
+    def reset(self):
+        "forget the previous frame, the next frame is drawn at the cursor position"
+        self.previous = [[]]
+        self._row = 0
+        self._col = 0
+
+    def _move(self, row: int, col: int) -> str:
+        codes = ""
+        if row < self._row:
+            codes += f"\x1b[{self._row - row}A"
+        elif row > self._row:
+            codes += f"\x1b[{row - self._row}B"
+        if col != self._col:
+            codes += "\r" + (f"\x1b[{col}C" if col else "")
+        self._row, self._col = row, col
+        return codes
+
+    def _run(self, run: list[tuple[str, str]]) -> str:
+        result = ""
+        current = ""
+        for style, glyph in run:
+            if style != current:
+                result += ("\x1b[0m" if current else "") + style
+                current = style
+            result += glyph
+        self._col += len(run)
+        return result + ("\x1b[0m" if current else "")
+
+    def diff(self, frame: SupportsStr) -> str:
+        "returns the escape codes that turn the previous frame into `frame`"
+        lines = [cells(line) for line in str(frame).splitlines()] or [[]]
+        previous = self.previous
+        if lines == previous[: len(lines)] and all(
+            not line for line in previous[len(lines) :]
+        ):
+            return ""
+
+        output = ""
+        if len(lines) > len(previous):
+            # grow the region downwards, scrolling the terminal when needed
+            output += self._move(len(previous) - 1, self._col)
+            output += "\r\n" * (len(lines) - len(previous))
+            self._row, self._col = len(lines) - 1, 0
+            previous = previous + [[] for _ in range(len(lines) - len(previous))]
+        # the region never shrinks, lines that disappeared are blanked instead
+        lines += [[] for _ in range(len(previous) - len(lines))]
+
+        for row, (old, new) in enumerate(zip(previous, lines)):
+            if old == new:
+                continue
+            start = 0
+            for start in range(min(len(old), len(new)) + 1):
+                if start == len(old) or start == len(new) or old[start] != new[start]:
+                    break
+            end = len(new)
+            if len(old) == len(new):
+                while end > start and old[end - 1] == new[end - 1]:
+                    end -= 1
+            # never start or stop a run between the two cells of a wide glyph
+            if 0 < start < len(new) and new[start][1] == "":
+                start -= 1
+            if end < len(new) and new[end][1] == "":
+                end += 1
+            output += self._move(row, start) + self._run(new[start:end])
+            if len(new) < len(old):
+                output += "\x1b[K"
+
+        self.previous = lines
+        return output + self._move(len(lines) - 1, 0)
+
+    def draw(self, frame: SupportsStr):
+        "draw the frame, writing nothing at all when it did not change"
+        output = self.diff(frame)
+        if output:
+            self.driver.stdout(output)
+
+    def clear(self):
+        "erase the whole region and move the cursor back to its first line"
+        output = ""
+        for row in range(len(self.previous) - 1, -1, -1):
+            output += self._move(row, 0) + "\x1b[K"
+        self.driver.stdout(output)
+        self.reset()
+
+    def finish(self):
+        "leave the region as is and move the cursor to the line after it"
+        self.driver.stdout(self._move(len(self.previous) - 1, 0) + "\n")
+        self.reset()
+
+
+class RenderScheduler:
+    "a single render thread that multiplexes every live region of a terminal"
+
+    _shared: dict[int, "RenderScheduler"] = {}
+    _shared_lock = threading.Lock()
+
+    regions: list["LiveRegion"]
+
+    @classmethod
+    def shared(cls, driver: "TerminalDriver") -> "RenderScheduler":
+        "the scheduler that owns the output stream of the driver"
+        with cls._shared_lock:
+            scheduler = cls._shared.get(id(driver._stdout))
+            if scheduler is None:
+                scheduler = cls._shared[id(driver._stdout)] = cls(driver)
+            return scheduler
+
+    def __init__(self, driver: "TerminalDriver") -> None:
+        self.driver = driver
+        self.renderer = DiffRenderer(driver)
+        self.regions = []
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    def add(self, region: "LiveRegion"):
+        "start redrawing a region below the others"
+        with self._condition:
+            region._frame = ""
+            region._due = 0.0
+            region._stopping = False
+            region.error = None
+            region._done.clear()
+            self.regions.append(region)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def remove(self, region: "LiveRegion"):
+        "draw the last frame of a region and stop redrawing it"
+        with self._condition:
+            if region not in self.regions:
+                return
+            region._stopping = True
+            self._condition.notify()
+        if threading.current_thread() is not self._thread:
+            region._done.wait()
+
+    def wake(self, region: "LiveRegion"):
+        "redraw a region now instead of at its next interval"
+        with self._condition:
+            if region in self.regions:
+                region._due = 0.0
+                self._condition.notify()
+
+    def _run(self):
+        with self._condition:
+            try:
+                self._loop()
+            finally:
+                # whatever stopped the loop, nobody may be left waiting on it
+                for region in self.regions:
+                    region._done.set()
+                self.regions.clear()
+                self.renderer.reset()
+                self._thread = None
+
+    def _loop(self):
+        while self.regions:
+            now = time.monotonic()
+            for region in self.regions:
+                if region._stopping or region._due <= now:
+                    try:
+                        region._frame = str(region.render())
+                    except Exception as error:
+                        # a failing region is finished, the others keep going
+                        region.error = error
+                        region._stopping = True
+                    region._due = max(region._due + region.interval, now)
+            finished = [region for region in self.regions if region._stopping]
+
+            try:
+                with self.driver.frame():
+                    if finished:
+                        # leave the finished regions behind and redraw the rest below
+                        self.renderer.clear()
+                        for region in finished:
+                            self.regions.remove(region)
+                            if not region.transient:
+                                self.driver.stdout(region._frame + "\n")
+                    self.renderer.draw(
+                        "\n".join(region._frame for region in self.regions)
+                    )
+            finally:
+                for region in finished:
+                    region._done.set()
+
+            if self.regions:
+                due = min(region._due for region in self.regions)
+                self._condition.wait(max(due - time.monotonic(), 0))
+
+
+class LiveRegion(ABC):
+    "a region of the terminal that is redrawn by the shared `RenderScheduler`"
 
     def __init__(
         self,
-        content: SupportsStr,
         *,
         transient: bool = True,
         refresh_per_second: int = 4,
+        driver: "TerminalDriver | None" = None,
     ) -> None:
-        self.content = content
         self._lock = threading.Lock()
         self.started = False
         self.transient = transient
         self.refresh_per_second = refresh_per_second
-        self.driver = TerminalDriver()
+        self.driver = driver or TerminalDriver(synchronized=True)
+        self._done = threading.Event()
+        self._frame = ""
+        self._due = 0.0
+        self._stopping = False
+        # the exception that stopped the region when `render` failed
+        self.error: Exception | None = None
 
-    def update(self, renderable: SupportsStr):
-        with self._lock:
-            self.content = renderable
+    @property
+    def interval(self) -> float:
+        return 1 / self.refresh_per_second
 
-    def start(self):
-        with self._lock:
-            if self.started:
-                return
-            self.started = True
+    @property
+    def scheduler(self) -> RenderScheduler:
+        return RenderScheduler.shared(self.driver)
 
-        refresh_interval = 1 / self.refresh_per_second
-        last = None
-        while True:
-            with self._lock:
-                if not self.started:
-                    break
-                amount_lines = Measurement(last).visible[1]
-                if last:
-                    if amount_lines > 1:
-                        for _ in range(amount_lines):
-                            self.driver.clear_line()
-                            self.driver.code("A")
-                            self.driver.stdout("\r")
-                    else:
-                        self.driver.clear_line()
-                        self.driver.stdout("\r")
-                last = str(self.content)
-                self.driver.stdout(last)
-            time.sleep(refresh_interval)
-
-        if self.transient:
-            self.driver.clear_line()
-            self.driver.stdout("\r")
-        else:
-            self.driver.stdout("\n")
+    @abstractmethod
+    def render(self) -> SupportsStr:
+        "the next frame of the region"
 
-    def stop(self):
+    def start(self):
+        "show the region and block until `stop` is called"
+        self.__enter__()
+        self._done.wait()
 
+    def stop(self):
         with self._lock:
+            if not self.started:
+                return
             self.started = False
+        self.scheduler.remove(self)
 
     def __enter__(self):
-        threading.Thread(target=self.start).start()
+        with self._lock:
+            if self.started:
+                return self
+            self.started = True
+        self.scheduler.add(self)
         return self
 
     def __exit__(self, *exc_info):
         self.stop()
 
 
-class Status:
+class Live(LiveRegion):
+    "live display content using the shared render thread"
+
+    def __init__(
+        self,
+        content: SupportsStr,
+        *,
+        transient: bool = True,
+        refresh_per_second: int = 4,
+        driver: "TerminalDriver | None" = None,
+    ) -> None:
+        super().__init__(
+            transient=transient, refresh_per_second=refresh_per_second, driver=driver
+        )
+        self.content = content
+
+    def update(self, renderable: SupportsStr):
+        with self._lock:
+            self.content = renderable
+
+    def render(self) -> SupportsStr:
+        with self._lock:
+            return self.content
+
+
+class Status(LiveRegion):
     "display work progress with a spinner"
 
     def __init__(
@@ -1043,42 +2982,23 @@ class Status:
         spinner: list[str] = [".  ", ".. ", "...", " ..", "  .", "   "],
         transient: bool = True,
         refresh_per_second: int = 4,
+        driver: "TerminalDriver | None" = None,
     ) -> None:
+        super().__init__(
+            transient=transient, refresh_per_second=refresh_per_second, driver=driver
+        )
         self.progress = str(progress)
         self.spinner = spinner
-        self._lock = threading.Lock()
-        self.started = False
-        self.transient = transient
-        self.refresh_per_second = refresh_per_second
-        self.driver = TerminalDriver()
+        self._animation = Animation(self.spinner, loop=True)  # type: ignore
 
-    def start(self):
+    def update(self, progress: SupportsStr):
         with self._lock:
-            if self.started:
-                return
-            self.started = True
-
-        spinner = Animation(self.spinner, loop=True)  # type: ignore
-        interval = 1 / self.refresh_per_second
-        with Live(str(spinner), transient=self.transient) as liv:
-            while True:
-                with self._lock:
-                    if not self.started:
-                        break
-                    spinner.update()
-                    liv.update(f"{str(spinner)} {self.progress}")
-                time.sleep(interval)
+            self.progress = str(progress)
 
-    def stop(self):
+    def render(self) -> SupportsStr:
         with self._lock:
-            self.started = False
-
-    def __enter__(self):
-        threading.Thread(target=self.start).start()
-        return self
-
-    def __exit__(self, *exc_info):
-        self.stop()
+            self._animation.update()
+            return f"{str(self._animation)} {self.progress}"
 
 
 def rule(
@@ -1090,13 +3010,15 @@ def rule(
 ):
     "rule with the given character and width and a title"
     _character = str(character).replace("\n", " ").expandtabs(4)
-    char_len = Measurement(_character).visible[0]
+    char_len = visible_width(_character)
     content = str(Line(str(_character) * ((width // char_len)), newline=""))
     if title:
-        m = Measurement(content)
         c = Canvas(width, 1)
         c.project(content)
-        c.project(" " + title + " ", x=(m.visible[0] // 2 - (len(title) // 2) - 1))
+        c.project(
+            " " + title + " ",
+            x=(visible_width(content) // 2 - (visible_width(title) // 2) - 1),
+        )
         content = str(c.render())
     return content + ("\n" if newline else "")
 
@@ -1108,44 +3030,62 @@ class Table:
         self, *headers: SupportsStr, table_style: TableStyle = ("│", "─", "┼")
     ) -> None:
         self.headers = tuple(map(str, headers))
-        self.data: list[list[SupportsStr]] = []
+        self.data: list[list[str]] = []
         self.style = table_style
+        self.widths = [visible_width(header) for header in self.headers]
 
     def add_row(self, *columns: SupportsStr) -> None:
-        self.data.append(list(columns))
-
-    def __str__(self) -> str:
-        def pad_cell(cell: str, width: int) -> str:
-            visible_width = Measurement(cell).visible[0]
-            return f" {cell}{' ' * (width - visible_width)} "
-
-        def format_row(row: list[str], widths: list[int]) -> str:
-            return self.style[0].join(
-                pad_cell(cell, width) for cell, width in zip(row, widths)
-            )
-
-        rows = [[str(cell) for cell in row] for row in self.data]
-        headers = list(self.headers)
-
-        columns = list(zip(headers, *rows))
-        column_widths = [
-            max(Measurement(cell).visible[0] for cell in col) for col in columns
+        "add a row, the cells are rendered once when they are added"
+        row = [str(cell) for cell in columns]
+        self.data.append(row)
+        widths = self.widths
+        for index, cell in enumerate(row[: len(widths)]):
+            width = visible_width(cell)
+            if width > widths[index]:
+                widths[index] = width
+
+    def recalculate(self):
+        "recompute the column widths after `data` was modified directly"
+        self.data = [[str(cell) for cell in row] for row in self.data]
+        self.widths = [
+            max(map(visible_width, column)) for column in zip(self.headers, *self.data)
         ]
 
-        header_row = format_row(headers, column_widths)
+    def _format_row(self, row: Iterable[str]) -> str:
+        return self.style[0].join(
+            f" {cell}{' ' * (width - visible_width(cell))} "
+            for cell, width in zip(row, self.widths)
+        )
 
-        separator = (self.style[1] + self.style[2] + self.style[1]).join(
+    def _separator(self) -> str:
+        return (self.style[1] + self.style[2] + self.style[1]).join(
             self.style[1] * (w + (1 if i == 0 else 0))
-            for i, w in enumerate(column_widths)
+            for i, w in enumerate(self.widths)
         )
 
-        data_rows = "\n".join(format_row(row, column_widths) for row in rows)
+    def stream(
+        self, start: int = 0, stop: int | None = None, *, header: bool = True
+    ) -> Generator[str, None, None]:
+        "yield the formatted lines of the table one at a time"
+        if header:
+            yield self._format_row(self.headers)
+            yield self._separator()
+        for index in range(*slice(start, stop).indices(len(self.data))):
+            yield self._format_row(self.data[index])
+
+    def render(
+        self, start: int = 0, stop: int | None = None, *, header: bool = True
+    ) -> str:
+        "render only the rows in `[start:stop]`, keeping the widths of the whole table"
+        return "\n".join(self.stream(start, stop, header=header))
+
+    def page(self, paginator: "Paginator", rows_per_page: int) -> str:
+        "render the rows of the page the paginator is pointing at"
+        start = (paginator.page - 1) * rows_per_page
+        return self.render(start, start + rows_per_page)
 
-        return (
-            f"{header_row}\n{separator}\n{data_rows}"
-            if rows
-            else f"{header_row}\n{separator}"
-        )
+    def __str__(self) -> str:
+        return self.render()
 
 
 class Sparkline:
@@ -1162,15 +3102,98 @@ class Sparkline:
             fg.brightmagenta("▆"),
             fg.red("█"),
         ],
+        capacity: Optional[int] = None,
     ):
-        self.data = data
+        if capacity is not None and capacity < 1:
+            raise ValueError(f"sparkline capacity must be at least 1, got {capacity}")
         self.sparkline_style = sparkline_style
+        self.capacity = capacity
+        self._reset(data)
+
+    def _reset(self, data: list[float]):
+        "replace every point of the sparkline"
+        capacity = self.capacity
+        if capacity is None:
+            self._data = data
+            return
+        # ring buffer mode: only the last `capacity` points are kept, the
+        # window min/max are tracked with monotonic deques and the rendered
+        # string is shifted by one glyph per feed
+        self._ring = array("d", [0.0]) * capacity
+        self._fed = 0
+        self._mins: deque[tuple[int, float]] = deque()
+        self._maxs: deque[tuple[int, float]] = deque()
+        self._glyphs: deque[str] = deque()
+        self._scale: tuple[float, float] | None = None
+        self._string: str | None = ""
+        for value in data[-capacity:]:
+            self.feed(value)
+
+    @property
+    def data(self) -> list[float]:
+        "the points of the sparkline (a copy in ring buffer mode)"
+        if self.capacity is None:
+            return self._data
+        count = min(self._fed, self.capacity)
+        return [
+            self._ring[index % self.capacity]
+            for index in range(self._fed - count, self._fed)
+        ]
+
+    @data.setter
+    def data(self, data: list[float]):
+        self._reset(data)
+
+    def _glyph(self, value: float, min_d: float, max_d: float) -> str:
+        range_d = max_d - min_d if max_d != min_d else 1
+        index = int((value - min_d) / range_d * (len(self.sparkline_style) - 1))
+        return self.sparkline_style[index]
 
     def feed(self, value: float):
         "add new point to data"
-        self.data.append(value)
+        if self.capacity is None:
+            self._data.append(value)
+            return
+        position = self._fed
+        self._fed += 1
+        self._ring[position % self.capacity] = value
+        oldest = self._fed - self.capacity
+        mins, maxs = self._mins, self._maxs
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        mins.append((position, value))
+        while maxs and maxs[-1][1] <= value:
+            maxs.pop()
+        maxs.append((position, value))
+        if mins[0][0] < oldest:
+            mins.popleft()
+        if maxs[0][0] < oldest:
+            maxs.popleft()
+
+        scale = (mins[0][1], maxs[0][1])
+        if scale != self._scale:
+            # every glyph depends on the scale, redraw them on the next render
+            self._scale = scale
+            self._glyphs.clear()
+            self._string = None
+            return
+        if self._string is None:
+            return
+        glyph = self._glyph(value, *scale)
+        if len(self._glyphs) == self.capacity:
+            self._string = self._string[len(self._glyphs.popleft()) :]
+        self._glyphs.append(glyph)
+        self._string += glyph
 
     def __str__(self) -> str:
+        if self.capacity is not None:
+            if self._string is None:
+                self._glyphs.extend(
+                    self._glyph(value, *cast(tuple[float, float], self._scale))
+                    for value in self.data
+                )
+                self._string = "".join(self._glyphs)
+            return self._string
         content = ""
         min_d = min(self.data)
         max_d = max(self.data)
@@ -1187,11 +3210,12 @@ class Group:
     def __init__(self, *renderables: SupportsStr) -> None:
         self.renderables = renderables
 
-    def __str__(self) -> str:
-        content = Segment("")
+    def __neon_write__(self, sink: SupportsWrite):
         for renderable in self.renderables:
-            content += Segment(str(renderable))
-        return str(content)
+            render_into(renderable, sink)
+
+    def __str__(self) -> str:
+        return _render(self)
 
 
 class View:
@@ -1206,11 +3230,12 @@ class View:
     def extendChilds(self, *renderables: SupportsStr):
         self.renderables.extend(renderables)
 
-    def __str__(self) -> str:
-        content = Segment("")
+    def __neon_write__(self, sink: SupportsWrite):
         for renderable in self.renderables:
-            content += Segment(str(renderable))
-        return str(content)
+            render_into(renderable, sink)
+
+    def __str__(self) -> str:
+        return _render(self)
 
 
 def group(func: Callable[..., Iterable[SupportsStr]]):
@@ -1223,13 +3248,34 @@ def group(func: Callable[..., Iterable[SupportsStr]]):
     return wrapper
 
 
+def render_into(renderable: SupportsStr, sink: SupportsWrite):
+    "stream a renderable into a sink (a `StringIO`, a `TerminalDriver`, ...) without building intermediate strings"
+    if isinstance(renderable, str):
+        sink.write(renderable)
+    elif hasattr(renderable, "__neon_write__"):
+        cast(SupportsNeonWrite, renderable).__neon_write__(sink)
+    elif hasattr(renderable, "__neon__"):
+        for piece in cast(SupportAutoRepr, renderable).__neon__():
+            render_into(piece, sink)
+    else:
+        sink.write(str(renderable))
+
+
+def _render(renderable: SupportsStr) -> str:
+    buffer = StringIO()
+    render_into(renderable, buffer)
+    return buffer.getvalue()
+
+
 def joingen(func: Callable[..., Generator[SupportsStr, SupportsStr | None, None]]):
     "a decorator that joins the output of a function into a single renderable"
 
     @wraps(func)
     def wrapper(*args, **kwargs) -> str:
-        renderables = list(func(*args, **kwargs))
-        return str(Group(*renderables))
+        buffer = StringIO()
+        for renderable in func(*args, **kwargs):
+            render_into(renderable, buffer)
+        return buffer.getvalue()
 
     return wrapper
 
@@ -1249,23 +3295,524 @@ def autorepr(func: Callable[P, Generator[SupportsStr, SupportsStr | None, None]]
 
     @wraps(func)
     def wrapper(*args: P.args, **kwargs: P.kwargs):
+        if _profiler is not None:
+            return _profiler.trace(func.__qualname__, joingen(func), *args, **kwargs)
         return joingen(func)(*args, **kwargs)
 
     return cast(Callable[P, str], wrapper)
 
 
+@dataclass
+class ProfileNode:
+    "a renderable in the call tree recorded by `RenderProfiler`"
+
+    name: str
+    calls: int = 0
+    time: float = 0.0
+    size: int = 0
+    children: dict[str, "ProfileNode"] = field(default_factory=dict)
+
+    @property
+    def self_time(self) -> float:
+        "the time spent in this renderable but not in the ones it rendered"
+        return self.time - sum(child.time for child in self.children.values())
+
+    def child(self, name: str) -> "ProfileNode":
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = ProfileNode(name)
+        return node
+
+    def asdict(self) -> dict:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "time": self.time,
+            "self_time": self.self_time,
+            "size": self.size,
+            "children": [child.asdict() for child in self.children.values()],
+        }
+
+
+class _CountingSink:
+    "forwards writes to a sink while counting the characters"
+
+    def __init__(self, sink: SupportsWrite) -> None:
+        self.sink = sink
+        self.size = 0
+
+    def write(self, data: str):
+        self.size += len(data)
+        return self.sink.write(data)
+
+
+# the enabled profiler, checked by `autorepr` wrappers on every call
+_profiler: "RenderProfiler | None" = None
+
+
+class RenderProfiler:
+    """
+    opt-in profiler recording every `__str__`, `__neon_write__` and `__neon__`
+    call of the neon renderables (and every `@autorepr` function) as a call
+    tree with the call count, the cumulative time and the output size.
+    the methods are only wrapped while the profiler is enabled
+    """
+
+    def __init__(self) -> None:
+        self.root = ProfileNode("<render>")
+        self._local = threading.local()
+        self._patched: list[tuple[type, str, Callable]] = []
+
+    def enable(self):
+        global _profiler
+        if _profiler is not None:
+            raise RuntimeError("another RenderProfiler is already enabled")
+        for value in list(globals().values()):
+            if (
+                not isinstance(value, type)
+                or value.__module__ != __name__
+                or getattr(value, "_is_protocol", False)
+            ):
+                continue
+            for attribute, wrap in (
+                ("__str__", self._wrap_str),
+                ("__neon_write__", self._wrap_write),
+                ("__neon__", self._wrap_neon),
+            ):
+                method = value.__dict__.get(attribute)
+                if callable(method):
+                    self._patched.append((value, attribute, method))
+                    setattr(value, attribute, wrap(attribute, method))
+        _profiler = self
+
+    def disable(self):
+        global _profiler
+        for cls, attribute, method in reversed(self._patched):
+            setattr(cls, attribute, method)
+        self._patched.clear()
+        if _profiler is self:
+            _profiler = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def reset(self):
+        "forget everything that was recorded"
+        self.root = ProfileNode("<render>")
+        self._local = threading.local()
+
+    def _enter(self, name: str) -> ProfileNode:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = [self.root]
+        node = stack[-1].child(name)
+        stack.append(node)
+        return node
+
+    def _exit(self, node: ProfileNode, start: float, size: int):
+        node.calls += 1
+        node.time += time.perf_counter() - start
+        node.size += size
+        stack = self._local.stack
+        if stack[-1] is node:
+            stack.pop()
+        elif node in stack:
+            # an `__neon__` generator that was abandoned halfway
+            stack.remove(node)
+
+    def trace(self, name: str, function: Callable[..., str], *args, **kwargs) -> str:
+        "call `function` recording it as a node named `name`"
+        node = self._enter(name)
+        start = time.perf_counter()
+        result = ""
+        try:
+            result = function(*args, **kwargs)
+            return result
+        finally:
+            self._exit(node, start, len(result) if isinstance(result, str) else 0)
+
+    def _wrap_str(self, attribute: str, method: Callable):
+        @wraps(method)
+        def __str__(obj):
+            return self.trace(f"{type(obj).__qualname__}.{attribute}", method, obj)
+
+        return __str__
+
+    def _wrap_write(self, attribute: str, method: Callable):
+        @wraps(method)
+        def __neon_write__(obj, sink: SupportsWrite):
+            counter = _CountingSink(sink)
+            node = self._enter(f"{type(obj).__qualname__}.{attribute}")
+            start = time.perf_counter()
+            try:
+                method(obj, counter)
+            finally:
+                self._exit(node, start, counter.size)
+
+        return __neon_write__
+
+    def _wrap_neon(self, attribute: str, method: Callable):
+        @wraps(method)
+        def __neon__(obj, *args, **kwargs):
+            node = self._enter(f"{type(obj).__qualname__}.{attribute}")
+            start = time.perf_counter()
+            size = 0
+            try:
+                for piece in method(obj, *args, **kwargs):
+                    if isinstance(piece, str):
+                        size += len(piece)
+                    yield piece
+            finally:
+                self._exit(node, start, size)
+
+        return __neon__
+
+    def table(self) -> "Table":
+        "the call tree as a neon `Table`, the slowest renderables first"
+        table = Table("renderable", "calls", "total", "self", "output")
+
+        def visit(node: ProfileNode, depth: int):
+            for child in sorted(node.children.values(), key=lambda n: -n.time):
+                table.add_row(
+                    "  " * depth + child.name,
+                    child.calls,
+                    f"{child.time * 1000:.3f} ms",
+                    f"{child.self_time * 1000:.3f} ms",
+                    f"{child.size:,}",
+                )
+                visit(child, depth + 1)
+
+        visit(self.root, 0)
+        return table
+
+    def json(self) -> str:
+        "the call tree as json, times in seconds and sizes in characters"
+        import json
+
+        return json.dumps([child.asdict() for child in self.root.children.values()])
+
+    def collapsed(self) -> str:
+        "the call tree as folded stacks (`a;b;c weight`) for flamegraph.pl or speedscope, weighted by self time in microseconds"
+        lines: list[str] = []
+
+        def visit(node: ProfileNode, path: str):
+            for child in node.children.values():
+                stack = f"{path};{child.name}" if path else child.name
+                weight = round(child.self_time * 1_000_000)
+                if weight > 0:
+                    lines.append(f"{stack} {weight}")
+                visit(child, stack)
+
+        visit(self.root, "")
+        return "\n".join(lines)
+
+
 class Screen:
     "renders the renderables within the whole terminal screen and crop the extra"
 
-    def __init__(self, *renderables: SupportsStr):
+    def __init__(
+        self, *renderables: SupportsStr, driver: "TerminalDriver | None" = None
+    ):
         self.renderable = Group(*renderables)
-        self.driver = TerminalDriver()
+        self.driver = driver or TerminalDriver()
+        # reused across frames, only resized when the terminal is
+        self.canvas = Canvas(0, 0)
 
     def __str__(self):
-        width, height = self.driver.width, self.driver.height
-        c = Canvas(width, height)
-        c.project(crop(self.renderable, (width, height)))
-        return str(c.render())
+        size = self.driver.size
+        if (self.canvas.width, self.canvas.height) != (size.columns, size.lines):
+            self.canvas.width, self.canvas.height = size.columns, size.lines
+            self.canvas.recalculate_buffer_length()
+        self.canvas.clear()
+        self.canvas.project(self.renderable)
+        return str(self.canvas.render())
+
+
+type LayoutSize = int | str
+
+
+class Box(ABC):
+    "a node of the layout engine, measures itself and draws into a region of a canvas"
+
+    def _children(self) -> "list[Box]":
+        return []
+
+    def _nodes(self) -> "Generator[Box, None, None]":
+        yield self
+        for child in self._children():
+            yield from child._nodes()
+
+    def _remember(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        "`compute()` once per layout pass, so a box is measured once for a given width"
+        memo = self.__dict__.setdefault("_memo", {})
+        if key not in memo:
+            memo[key] = compute()
+        return memo[key]
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        # a new title, padding, child or sizes invalidates the cached layout
+        if not name.startswith("_"):
+            super().__setattr__("_dirty", True)
+
+    def size(self, width: int) -> tuple[int, int]:
+        "`measure`, remembered until the next layout pass"
+        memo = self.__dict__.setdefault("_memo", {})
+        # a box that took fewer columns than it was offered has the same size
+        # for every width in between, so drawing it at the width it asked for
+        # does not measure it again
+        for key, found in memo.items():
+            if key[0] == "size" and found[0] <= width <= key[1]:
+                return found
+        return self._remember(("size", width), lambda: self.measure(width))
+
+    def _refresh(self) -> bool:
+        "render the content of every leaf once, returns whether anything changed"
+        changed = self.__dict__.pop("_dirty", False)
+        for child in self._children():
+            changed = child._refresh() or changed
+        return changed
+
+    @abstractmethod
+    def measure(self, width: int) -> tuple[int, int]:
+        "the size the box wants when at most `width` columns are available, the same for any width it does not need (use `size` on children)"
+
+    @abstractmethod
+    def draw(self, canvas: Canvas, x: int, y: int, width: int, height: int):
+        "draw the box into the region of the canvas"
+
+    def render(self, width: int | None = None, height: int | None = None) -> str:
+        "lay the box out in a single canvas (cached until a box, a child or the terminal size changes)"
+        width = TerminalDriver().width if width is None else width
+        changed = self._refresh()
+        cache = getattr(self, "_layout_cache", None)
+        if not changed and cache and cache[0] == (width, height):
+            return cache[1]
+        for node in self._nodes():
+            node._memo = {}
+        measured_width, measured_height = self.size(width)
+        canvas = Canvas(measured_width, measured_height if height is None else height)
+        self.draw(canvas, 0, 0, canvas.width, canvas.height)
+        result = str(canvas.render())
+        self._layout_cache = ((width, height), result)
+        return result
+
+    def __str__(self) -> str:
+        return self.render()
+
+
+class _Leaf(Box):
+    "wraps a renderable that is not a box"
+
+    def __init__(self, renderable: SupportsStr) -> None:
+        self.renderable = renderable
+        self._text: str | None = None
+        self._sprite = Sprite("")
+
+    def _refresh(self) -> bool:
+        changed = super()._refresh()
+        text = str(self.renderable)
+        if text == self._text:
+            return changed
+        self._text = text
+        self._sprite = Sprite(text)
+        return True
+
+    def measure(self, width: int) -> tuple[int, int]:
+        return min(self._sprite.width, width), self._sprite.height
+
+    def draw(self, canvas: Canvas, x: int, y: int, width: int, height: int):
+        canvas.project(self._sprite, x=x, y=y, width=width, height=height)
+
+
+def _box(renderable: SupportsStr) -> Box:
+    return renderable if isinstance(renderable, Box) else _Leaf(renderable)
+
+
+def _allot(sizes: list[LayoutSize], natural: list[int], space: int) -> list[int]:
+    "split `space` between fixed (int), `auto` and fractional (`<n>fr`) sizes"
+    result = [0] * len(sizes)
+    fractions: dict[int, float] = {}
+    for index, size in enumerate(sizes):
+        if isinstance(size, int):
+            result[index] = size
+        elif size == "auto":
+            result[index] = natural[index]
+        elif size.endswith("fr"):
+            fractions[index] = float(size[:-2] or 1)
+        else:
+            raise ValueError(f"unknown layout size {size!r}")
+    remaining = max(space - sum(result), 0)
+    total = sum(fractions.values())
+    given = 0
+    for count, (index, fraction) in enumerate(fractions.items(), 1):
+        # the last fraction takes the rounding leftovers
+        share = (
+            remaining - given
+            if count == len(fractions)
+            else int(remaining * fraction / total)
+        )
+        result[index] = share
+        given += share
+    return result
+
+
+class Panel(Box):
+    "a box with a border and padding around its content"
+
+    def __init__(
+        self,
+        renderable: SupportsStr,
+        *,
+        padding: PaddingRecipe = (0, 0, 0, 0),
+        border: TextBorder = BORDER_STYLE_ROUND,
+        title: SupportsStr | None = None,
+        width: int | None = None,
+        height: int | None = None,
+    ) -> None:
+        self.child = _box(renderable)
+        self.padding = padding
+        self.border = border
+        self.title = title
+        self.width = width
+        self.height = height
+
+    def _children(self) -> list[Box]:
+        return [self.child]
+
+    def _extra(self) -> tuple[int, int]:
+        left, bottom, top, right = self.padding
+        return left + right + 2, top + bottom + 2
+
+    def measure(self, width: int) -> tuple[int, int]:
+        extra_width, extra_height = self._extra()
+        width = min(width, self.width) if self.width is not None else width
+        inner_width, inner_height = self.child.size(max(width - extra_width, 0))
+        return (
+            width if self.width is not None else min(inner_width + extra_width, width),
+            self.height if self.height is not None else inner_height + extra_height,
+        )
+
+    def draw(self, canvas: Canvas, x: int, y: int, width: int, height: int):
+        if width < 2 or height < 2:
+            return
+        (top, bottom), (left, right), corners = [
+            [(cells(piece) or [("", " ")])[0] for piece in group]
+            for group in self.border
+        ]
+        for (style, glyph), row in ((top, y), (bottom, y + height - 1)):
+            canvas.fill(glyph, x=x + 1, y=row, width=width - 2, height=1, style=style)
+        for (style, glyph), col in ((left, x), (right, x + width - 1)):
+            canvas.fill(glyph, x=col, y=y + 1, width=1, height=height - 2, style=style)
+        for (style, glyph), (col, row) in zip(
+            corners,
+            (
+                (x, y),
+                (x + width - 1, y),
+                (x, y + height - 1),
+                (x + width - 1, y + height - 1),
+            ),
+        ):
+            canvas.fill(glyph, x=col, y=row, width=1, height=1, style=style)
+        if self.title:
+            canvas.project(f" {self.title} ", x=x + 2, y=y, width=width - 4, height=1)
+        pad_left, pad_bottom, pad_top, pad_right = self.padding
+        extra_width, extra_height = self._extra()
+        self.child.draw(
+            canvas,
+            x + 1 + pad_left,
+            y + 1 + pad_top,
+            max(width - extra_width, 0),
+            max(height - extra_height, 0),
+        )
+
+
+class Columns(Box):
+    "places boxes side by side, each column is fixed (int), `auto` or a fraction (`1fr`)"
+
+    def __init__(
+        self,
+        *renderables: SupportsStr,
+        widths: list[LayoutSize] | None = None,
+        gap: int = 1,
+    ) -> None:
+        self.children = [_box(renderable) for renderable in renderables]
+        self.widths = widths or ["1fr"] * len(self.children)
+        self.gap = gap
+
+    def _children(self) -> list[Box]:
+        return self.children
+
+    def _allot(self, width: int) -> list[int]:
+        return self._remember(("widths", width), lambda: self._split(width))
+
+    def _split(self, width: int) -> list[int]:
+        space = max(width - self.gap * (len(self.children) - 1), 0)
+        natural = [
+            child.size(space)[0] if size == "auto" else 0
+            for child, size in zip(self.children, self.widths)
+        ]
+        return _allot(self.widths, natural, space)
+
+    def measure(self, width: int) -> tuple[int, int]:
+        widths = self._allot(width)
+        height = max(
+            (child.size(w)[1] for child, w in zip(self.children, widths)), default=0
+        )
+        return min(sum(widths) + self.gap * (len(widths) - 1), width), height
+
+    def draw(self, canvas: Canvas, x: int, y: int, width: int, height: int):
+        for child, child_width in zip(self.children, self._allot(width)):
+            child.draw(canvas, x, y, min(child_width, width), height)
+            x += child_width + self.gap
+            width -= child_width + self.gap
+            if width <= 0:
+                break
+
+
+class Rows(Box):
+    "stacks boxes vertically, each row is fixed (int), `auto` or a fraction of the leftover height"
+
+    def __init__(
+        self,
+        *renderables: SupportsStr,
+        heights: list[LayoutSize] | None = None,
+        gap: int = 0,
+    ) -> None:
+        self.children = [_box(renderable) for renderable in renderables]
+        self.heights = heights or ["auto"] * len(self.children)
+        self.gap = gap
+
+    def _children(self) -> list[Box]:
+        return self.children
+
+    def _allot(self, width: int, height: int) -> list[int]:
+        natural = [child.size(width)[1] for child in self.children]
+        space = max(height - self.gap * (len(self.children) - 1), 0)
+        return _allot(self.heights, natural, space)
+
+    def measure(self, width: int) -> tuple[int, int]:
+        sizes = [child.size(width) for child in self.children]
+        heights = [
+            size if isinstance(size, int) else natural
+            for size, (_, natural) in zip(self.heights, sizes)
+        ]
+        return (
+            max((w for w, _ in sizes), default=0),
+            sum(heights) + self.gap * (len(heights) - 1),
+        )
+
+    def draw(self, canvas: Canvas, x: int, y: int, width: int, height: int):
+        for child, child_height in zip(self.children, self._allot(width, height)):
+            child.draw(canvas, x, y, width, min(child_height, height))
+            y += child_height + self.gap
+            height -= child_height + self.gap
+            if height <= 0:
+                break
 
 
 class Paginator:
@@ -1309,6 +3856,16 @@ class ScaleBar:
     def reset(self):
         self.completed = 0
 
+    @property
+    def steps(self) -> int:
+        "how many different fill levels the bar can show"
+        return self.width
+
+    @property
+    def filled(self) -> int:
+        "the number of filled cells"
+        return (self.completed * self.width) // self.total
+
     def __neon__(self) -> Generator[SupportsStr, SupportsStr | None, None]:
         if self.completed == self.total:
             yield f"{self.scale_style[0]*self.width}"
@@ -1321,6 +3878,107 @@ class ScaleBar:
         return str(useAutoRepr(self))
 
 
+class ProgressManager(LiveRegion):
+    "draws several progress bars at once as a region of the shared `RenderScheduler`"
+
+    bars: list[tuple[str, ProgressBar | ScaleBar]]
+
+    def __init__(
+        self,
+        *,
+        min_interval: float = 0.1,
+        transient: bool = False,
+        driver: TerminalDriver | None = None,
+    ) -> None:
+        super().__init__(transient=transient, driver=driver)
+        self.bars = []
+        self.min_interval = min_interval
+        self._lines: list[tuple[tuple, str]] = []
+
+    @property
+    def interval(self) -> float:
+        return self.min_interval
+
+    def add(
+        self, bar: ProgressBar | ScaleBar, *, label: SupportsStr = ""
+    ) -> ProgressBar | ScaleBar:
+        "show another bar below the existing ones"
+        with self._lock:
+            self.bars.append((str(label), bar))
+            self._lines.append(((), ""))
+        return bar
+
+    def update(self, bar: ProgressBar | ScaleBar, amount: int = 1):
+        bar.update(amount)
+        self.refresh()
+
+    def _line(self, index: int) -> str:
+        label, bar = self.bars[index]
+        if bar.total:
+            state = (bar.filled, bar.width, bar.completed * 100 // bar.total)
+        else:
+            state = (bar.completed,)
+        cached_state, line = self._lines[index]
+        if state != cached_state:
+            if bar.total:
+                line = f"{bar} {state[2]:>3}%"
+            else:
+                line = str(bar.completed)
+            line = f"{label} {line}" if label else line
+            self._lines[index] = (state, line)
+        return line
+
+    def render(self) -> SupportsStr:
+        with self._lock:
+            return "\n".join(map(self._line, range(len(self.bars))))
+
+    def refresh(self, *, force: bool = False):
+        "show the bars, they are redrawn every `min_interval` seconds or right away when forced"
+        if not self.started:
+            self.__enter__()
+        elif force:
+            self.scheduler.wake(self)
+
+    def track[T](
+        self,
+        iterable: Iterable[T],
+        *,
+        total: int | None = None,
+        label: SupportsStr = "",
+        width: int = 20,
+    ) -> Generator[T, None, None]:
+        "iterate over `iterable` while advancing a new bar"
+        if total is None and hasattr(iterable, "__len__"):
+            total = len(cast(list, iterable))
+        bar = cast(
+            ProgressBar, self.add(ProgressBar(total or 0, width=width), label=label)
+        )
+
+        def checkpoint(count: int) -> int:
+            # the next count at which the bar or its percentage will look different
+            if not total:
+                return count + 1024
+            steps = bar.steps
+            filled = count * steps // total
+            percent = count * 100 // total
+            return min(
+                ((filled + 1) * total + steps - 1) // steps,
+                ((percent + 1) * total + 99) // 100,
+            )
+
+        count = 0
+        next_checkpoint = checkpoint(0)
+        for item in iterable:
+            yield item
+            count += 1
+            if count >= next_checkpoint:
+                bar.completed = count
+                self.refresh()
+                next_checkpoint = checkpoint(count)
+        bar.completed = count
+        self.refresh(force=True)
+
+
 class Breadcrumb:
     "a breadcrumb to display a list of items in order of their hierarchy"
 
@@ -1394,6 +4052,255 @@ def link(text: SupportsStr, url: str):
     yield f"\033]8;;{url}\033\\{content}\033]8;;\033\\"
 
 
+@lru_cache(maxsize=None)
+def _lexer(name: str) -> "Lexer":
+    from pygments.lexers import get_lexer_by_name
+
+    return get_lexer_by_name(name)
+
+
+@lru_cache(maxsize=None)
+def _formatter(theme: "str | type[CodeStyle]") -> "Terminal256Formatter":
+    from pygments.formatters.terminal256 import Terminal256Formatter
+
+    return Terminal256Formatter(style=theme)
+
+
+@lru_cache(maxsize=256)
+def _highlight(code: str, lexer: "Lexer", formatter: "Terminal256Formatter") -> str:
+    from pygments import highlight as CodeHighlight
+
+    return CodeHighlight(code, lexer, formatter)
+
+
+# the parts of a pattern: a newline, escaped punctuation, character classes
+# (and the escapes for them), other escapes, dots, counted repetitions,
+# parentheses, group flags and plain characters
+_RULE_PARTS = re.compile(
+    r"(\\n)|\\([^\w\s])|(\\[sSwWdD]|\[\^?\]?(?:\\.|[^\]\\])*\])|\\.|(\.)"
+    r"|\{(\d*)[\d,]*\}|([()])|(?<=\()\?(?:P<\w+>|P=\w+\)|<?[=!]|[\w:-]*)"
+    r"|([^|*+?^$])",
+    re.DOTALL,
+)
+
+
+def _spans(pattern: re.Pattern) -> tuple[str, str] | None:
+    """
+    how a pattern can match over several lines, None when it cannot.
+    otherwise its literal text, which appended to text it has not finished
+    matching usually finishes it (the end of a block comment or docstring),
+    and what it reads past a newline: "blank" (only whitespace), "heredoc"
+    (text it refers back to, a word or a quote) or "text" (anything).
+    """
+    visible = stdstr.punctuation + stdstr.ascii_letters + stdstr.digits
+    literals: list[str] = []
+    kind = None
+    # for every open group, whether it can read whitespace past a newline and
+    # whether it looks behind or is a negative lookahead (its text is not added)
+    groups: list[bool] = []
+    lookarounds: list[bool] = []
+    for part in _RULE_PARTS.finditer(pattern.pattern):
+        newline, escaped, characters, dot, repeat, paren, plain = part.groups()
+        if paren == "(":
+            groups.append(False)
+            lookarounds.append(
+                pattern.pattern.startswith(("?!", "?<=", "?<!"), part.end())
+            )
+        elif paren and groups:
+            lookarounds.pop()
+            # repeated, it reads anything else in the group past newlines too
+            blank = groups.pop()
+            if blank and pattern.pattern[part.end() : part.end() + 1] in (
+                "*",
+                "+",
+                "{",
+            ):
+                kind = "text"
+            elif blank and groups:
+                groups[-1] = True
+        elif any(lookarounds):
+            continue
+        elif newline:
+            literals.append("\n")
+            if pattern.pattern[part.end() :].lstrip(")") not in ("", "$"):
+                kind = "text"
+        elif escaped or plain:
+            literals.append(escaped or plain)
+        elif dot and pattern.flags & re.DOTALL:
+            kind = "text"
+        elif characters:
+            matches = re.compile(characters, pattern.flags).match
+            matched = [char for char in visible if matches(char)]
+            literals.extend(matched[:1])
+            if matches("\n"):
+                kind = "text" if matched else kind or "blank"
+                if groups:
+                    groups[-1] = True
+        elif repeat and literals:
+            literals.append(literals[-1] * (int(repeat) - 1))
+    if kind and _BACKREFERENCE.search(pattern.pattern):
+        kind = "heredoc"
+    return ("".join(literals), kind) if kind else None
+
+
+_BACKREFERENCE = re.compile(r"\\\d|\(\?P=")
+
+
+@lru_cache(maxsize=None)
+def _rules(lexer: "Lexer") -> "dict[str, list[tuple]] | None":
+    """
+    the rules of a regex lexer by state, each with how it `_spans` lines, or
+    None when the lexer does not lex with its rules alone (it is re-lexed whole)
+    """
+    from pygments.lexer import ExtendedRegexLexer, RegexLexer
+
+    if not isinstance(lexer, RegexLexer) or type(lexer).get_tokens_unprocessed not in (
+        RegexLexer.get_tokens_unprocessed,
+        ExtendedRegexLexer.get_tokens_unprocessed,
+    ):
+        return None
+    # a stack the lexer keeps itself (xquery, haxe) is not in its context
+    if any(
+        name.endswith(("_state", "_stack")) and isinstance(getattr(lexer, name), list)
+        for name in dir(lexer)
+    ):
+        return None
+    return {
+        state: [
+            (match, action, new_state, *(_spans(match.__self__) or (None, None)))
+            for match, action, new_state in rules
+        ]
+        for state, rules in lexer._tokens.items()
+    }
+
+
+def _lex(
+    lexer: "Lexer", context: "LexerContext", at: int | None = None
+) -> "tuple[list[tuple], int, LexerContext]":
+    """
+    lex from the context like `get_tokens_unprocessed`, and find where to resume
+    once more text is appended (at `at`, the end of the text by default): the
+    last line started in the root state with no rule before it that would match
+    differently with more text (a block comment that is not closed yet, see
+    `_spans`).
+    returns the tokens, how many of them come before that line and the context
+    to lex it again from.
+    """
+    from copy import deepcopy
+
+    from pygments.lexer import ExtendedRegexLexer
+    from pygments.token import Error, Text, Whitespace, _TokenType
+
+    rules = _rules(lexer)
+    assert rules is not None
+    extended = isinstance(lexer, ExtendedRegexLexer)
+    text = context.text
+    tokens: list[tuple] = []
+    boundary, resume = 0, deepcopy(context)
+    pending = False
+    # the text lexed with more appended to it, from the line lexing started on
+    start = context.pos
+    at = len(text) if at is None else at
+    appended_texts: dict[str, str] = {}
+
+    def appended(more: str) -> str:
+        if more not in appended_texts:
+            appended_texts[more] = text[start:at] + more + text[at:]
+        return appended_texts[more]
+
+    # rules reading past newlines only through whitespace can only reach the
+    # end of the text from its last lines, which are also finished differently
+    last_line = text.rfind("\n", 0, len(text.rstrip()))
+    blank_from = text.rfind("\n", 0, max(last_line, 0)) + 1
+
+    def opens(match: Callable, closer: str, kind: str, pos: int, end: int) -> bool:
+        "whether a rule that matched up to `end` (-1 if not) from `pos` matches differently with more text"
+        if kind == "heredoc":
+            # what it refers back to is a word on its line, or one of its first
+            # characters (a quote, a delimiter), repeated
+            line_end = text.find("\n", pos)
+            words = set(
+                re.findall(r"\w+", text[pos : line_end if line_end >= 0 else None])
+            )
+            probes = [appended(f"\n{word}\n") for word in words]
+            probes.extend(appended(char * 3) for char in set(text[pos : pos + 2]))
+        else:
+            # the literal text on a new line, or just its last character (a closing
+            # quote), from the last lines also finishing the last line with it or
+            # going on with what the line ends with (a heading underline)
+            extra = ["\n" + closer, closer[-1:]]
+            if pos >= blank_from:
+                extra += [closer, text[at - 1 : at] * 3]
+            probes = [appended(more) for more in extra]
+        for probe in probes:
+            found = match(probe, pos - start)
+            if (found.end() + start if found else -1) != end:
+                return True
+        return False
+
+    while context.pos < context.end:
+        pos = context.pos
+        if (
+            tokens
+            and not pending
+            and context.stack == ["root"]
+            and text[pos - 1] == "\n"
+        ):
+            boundary, resume = len(tokens), deepcopy(context)
+        for match, action, new_state, closer, kind in rules[context.stack[-1]]:
+            found = match(text, pos, context.end)
+            # a rule matching over several lines may match, or match more,
+            # once more text is appended (an unclosed block comment)
+            if (
+                kind is not None
+                and not pending
+                and (kind != "blank" or pos >= blank_from)
+            ):
+                end = found.end() if found else -1
+                pending = opens(match, closer, kind, pos, end)
+            if found is None:
+                continue
+            if type(action) is _TokenType:
+                tokens.append((action, found.group()))
+                context.pos = found.end()
+            elif extended:
+                # the callbacks of an extended lexer move the context themselves
+                if action is not None:
+                    lexed = list(action(lexer, found, context))
+                    tokens.extend((t, v) for _, t, v in lexed)
+                    # one lexing past its match up to the end (a heredoc
+                    # without its delimiter yet) changes with more text
+                    if lexed and found.end() < len(text):
+                        pending |= lexed[-1][0] + len(lexed[-1][2]) >= len(text)
+            else:
+                if action is not None:
+                    tokens.extend((t, v) for _, t, v in action(lexer, found))
+                context.pos = found.end()
+            stack = context.stack
+            if isinstance(new_state, tuple):
+                for state in new_state:
+                    if state == "#pop":
+                        if len(stack) > 1:
+                            stack.pop()
+                    elif state == "#push":
+                        stack.append(stack[-1])
+                    else:
+                        stack.append(state)
+            elif isinstance(new_state, int):
+                del stack[1 if abs(new_state) >= len(stack) else new_state :]
+            elif new_state == "#push":
+                stack.append(stack[-1])
+            break
+        else:
+            if text[pos] == "\n":
+                context.stack = ["root"]
+                tokens.append((Text if extended else Whitespace, "\n"))
+            else:
+                tokens.append((Error, text[pos]))
+            context.pos += 1
+    return tokens, boundary, resume
+
+
 class Syntax:
     "a component to display code with syntax highlighting and line number"
 
@@ -1401,39 +4308,81 @@ class Syntax:
     def highlight(
         cls,
         text: SupportsStr,
-        lexer: Lexer | str,
+        lexer: "Lexer | str",
         *,
-        theme: str | CodeStyle = "monokai",
+        theme: "str | CodeStyle" = "monokai",
     ):
         "highlight an statement/expression only"
         if isinstance(lexer, str):
-            lexer = get_lexer_by_name(lexer)
-        else:
-            lexer = lexer
-        return CodeHighlight(str(text), lexer, Terminal256Formatter(style=theme))
+            lexer = _lexer(lexer)
+        return _highlight(str(text), lexer, _formatter(theme))
 
     def __init__(
         self,
         code: SupportsStr,
-        lexer: Lexer | str,
+        lexer: "Lexer | str",
         *,
-        theme: str | CodeStyle = "monokai",
+        theme: "str | CodeStyle" = "monokai",
         line_number_offset: int = 0,
         highlighted_lines: list[int] = [],
     ):
         self.code = code
         if isinstance(lexer, str):
-            self.lexer = get_lexer_by_name(lexer)
+            self.lexer = _lexer(lexer)
         else:
             self.lexer = lexer
-        self.formatter = Terminal256Formatter(style=theme)
+        self.formatter = _formatter(theme)
         self.line_number_offset = line_number_offset
         self.highlighted_lines = highlighted_lines
+        # state of the append mode, see `append`
+        self._source: str | None = None
+        self._lexed = ""
+        self._resume: "LexerContext | None" = None
+        self._stable_output = ""
+        self._tail_output = ""
+
+    def _format(self, tokens: list[tuple]) -> str:
+        output = StringIO()
+        self.formatter.format(tokens, output)
+        return output.getvalue()
+
+    def append(self, text: SupportsStr):
+        "append code, re-lexing only from the last line the lexer started in its root state"
+        from pygments.lexer import LexerContext
+
+        if self._source is None or self.code is not self._source:
+            self._source = str(self.code)
+            self._resume = None
+        self._source += str(text)
+        self.code = self._source
+
+        if _rules(self.lexer) is None or self.lexer.filters:
+            self._stable_output = ""
+            self._tail_output = self._format(list(self.lexer.get_tokens(self._source)))
+            return
+        # stripped, with its newlines normalized and ending with one like `highlight` does
+        code = self.lexer._preprocess_lexer_input(self._source)
+        context = self._resume
+        if context is None or not code.startswith(self._lexed[: context.pos]):
+            context = LexerContext(code, 0)
+            self._stable_output = ""
+        context.text, context.end = code, len(code)
+        # text appended later goes before the newline added at the end
+        added = self.lexer.ensurenl and not self._source.endswith(("\n", "\r"))
+        tokens, boundary, self._resume = _lex(self.lexer, context, len(code) - added)
+        self._lexed = code
+        self._stable_output += self._format(tokens[:boundary])
+        self._tail_output = self._format(tokens[boundary:])
+
+    @property
+    def highlighted(self) -> str:
+        "the highlighted code (cached)"
+        if self._source is not None and self.code is self._source:
+            return self._stable_output + self._tail_output
+        return _highlight(str(self.code), self.lexer, self.formatter)
 
     def __neon__(self):
-        content = str(self.code)
-        content = CodeHighlight(content, self.lexer, self.formatter)
-        lines = content.splitlines()
+        lines = self.highlighted.splitlines()
         space_width = 4
         index = self.line_number_offset + 1
         for line in lines:
@@ -1464,7 +4413,7 @@ class VerticalContainer:
 
     def __neon__(self):
         for renderable in self.renderables:
-            yield str(renderable)
+            yield renderable
             yield "\n"
 
     def __str__(self) -> str:
@@ -1493,15 +4442,18 @@ class Map:
         return str(useAutoRepr(self))
 
 
-@autorepr
-def pixelimage(
+@lru_cache(maxsize=32)
+def _pixelimage(
     path: str,
-    *,
-    width: Optional[int] = None,
-    height: Optional[int] = None,
-    texture: Optional[SupportsStr] = None,
-):
-    "renders an image into terminal columns"
+    mtime: float,
+    size: int,
+    width: Optional[int],
+    height: Optional[int],
+    texture: str,
+    halfblock: bool,
+) -> str:
+    from PIL import Image
+
     img = Image.open(path)
     img = img.convert("RGB")
     if width == None:
@@ -1509,11 +4461,71 @@ def pixelimage(
     if height == None:
         height = img.height
     img = img.resize((width or 0, height or 0))
-    for y in range(height or 0):
-        for x in range(width or 0):
-            rgb = cast(tuple[int, int, int], img.getpixel((x, y)))
-            yield rgb256(*rgb, True) + (str(texture) if texture else " ")
-    yield "\x1b[0m"
+    # one native integer per pixel, runs of equal colours compare as equal ints
+    pixels = array("I", img.convert("RGBX").tobytes())
+    if sys.byteorder == "big":
+        pixels.byteswap()
+    escapes: dict[tuple[int, bool], str] = {}
+
+    def escape(pixel: int, background: bool) -> str:
+        code = escapes.get((pixel, background))
+        if code is None:
+            code = rgb256(
+                pixel & 0xFF, (pixel >> 8) & 0xFF, (pixel >> 16) & 0xFF, background
+            )
+            escapes[(pixel, background)] = code
+        return code
+
+    def foreground(pixel: int) -> str:
+        return escape(pixel, False)
+
+    def background(pixel: int) -> str:
+        return escape(pixel, True)
+
+    # runs are grouped by escape code, neighbours quantized to the same
+    # palette color share one escape even when their rgb differs
+    result: list[str] = []
+    if not halfblock:
+        for y in range(0, width * height, width):
+            for code, run in groupby(map(background, pixels[y : y + width])):
+                result.append(code + texture * len(list(run)))
+            result.append("\x1b[0m\n")
+        return "".join(result)
+
+    # two pixel rows per terminal row: the top one as the foreground of an
+    # upper half block, the bottom one as its background
+    for y in range(0, height, 2):
+        top = map(foreground, pixels[y * width : (y + 1) * width])
+        if y + 1 < height:
+            bottom = map(background, pixels[(y + 1) * width : (y + 2) * width])
+            for (upper, lower), run in groupby(zip(top, bottom)):
+                result.append(upper + lower + "▀" * len(list(run)))
+        else:
+            for upper, run in groupby(top):
+                result.append(upper + "\x1b[49m" + "▀" * len(list(run)))
+        result.append("\x1b[0m\n")
+    return "".join(result)
+
+
+def pixelimage(
+    path: str,
+    *,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    texture: Optional[SupportsStr] = None,
+    halfblock: bool = False,
+) -> str:
+    "renders an image into terminal columns (in `halfblock` mode every row holds two pixel rows)"
+    stat = os.stat(path)
+    return _pixelimage(
+        str(path),
+        stat.st_mtime,
+        stat.st_size,
+        width,
+        height,
+        str(texture) if texture else " ",
+        halfblock,
+    )
 
 
 class rect(NamedTuple):
@@ -1551,11 +4563,139 @@ def unindent(string: SupportsStr) -> Multiline:
     return result
 
 
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40, "fatal": 50}
+
+# bumped whenever a level changes so departments can cache their inherited level
+_level_generation = 0
+
+
+def _level_value(level: int | str) -> int:
+    if isinstance(level, str):
+        return LOG_LEVELS[level.lower()]
+    return level
+
+
+def _set_level_changed():
+    global _level_generation
+    _level_generation += 1
+
+
+def _log_message(
+    message: "SupportsStr | Callable[[], SupportsStr]", args: tuple
+) -> str:
+    # only plain functions and lambdas are lazy messages, other callables
+    # (renderables with a __call__ for example) are logged as they are
+    if isinstance(message, FunctionType):
+        message = message()
+    if args:
+        return str(message) % args
+    return str(message)
+
+
+class LogFileSink:
+    "append-only log file that batches records and writes them from a background thread"
+
+    path: Path
+
+    def __init__(
+        self,
+        path: Path | str,
+        *,
+        buffer_size: int = 64 * 1024,
+        flush_interval: float = 1.0,
+        max_bytes: int = 0,
+        backup_count: int = 3,
+    ) -> None:
+        self.path = Path(path)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._buffer: list[bytes] = []
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._open()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __repr__(self) -> str:
+        return f"<LogFileSink for {self.path}>"
+
+    def _open(self):
+        # append mode: every write lands at the end, even with several processes
+        self._file = open(self.path, "ab")
+        self._written = self._file.tell()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def write(self, record: str):
+        "queue a record, it is written on the next flush"
+        data = record.encode()
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"write to a closed log file ({self.path})")
+            self._buffer.append(data)
+            self._buffered += len(data)
+            if self._buffered >= self.buffer_size:
+                self._wake.set()
+
+    def flush(self):
+        "write every queued record to the file"
+        with self._lock:
+            if not self._buffer or self._file.closed:
+                return
+            data = b"".join(self._buffer)
+            self._buffer.clear()
+            self._buffered = 0
+            if (
+                self.max_bytes
+                and self._written
+                and (self._written + len(data) > self.max_bytes)
+            ):
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._written += len(data)
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = self.path.with_name(f"{self.path.name}.{index}")
+                if source.exists():
+                    source.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+        self._open()
+
+    def close(self):
+        "flush the remaining records and close the file"
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+        self._file.close()
+        atexit.unregister(self.close)
+
+
 class LoggerSystem:
     "root logger system"
 
     module: str
     file: Optional[Path]
+    sink: Optional[LogFileSink]
     date_format: str
 
     def __init__(
@@ -1563,11 +4703,26 @@ class LoggerSystem:
         module: str,
         file: Optional[Path] = None,
         date_format: Optional[str] = None,
+        *,
+        sink: Optional[LogFileSink] = None,
+        level: int | str = 0,
     ) -> None:
         self.module = module
         self.file = file
+        self.sink = sink or (LogFileSink(file) if file else None)
         self.date_format = date_format or "[%Y/%m/%d %H:%M:%S]"
         self.driver = TerminalDriver()
+        self._level = _level_value(level)
+
+    @property
+    def level(self) -> int:
+        "records below this level are dropped by the departments"
+        return self._level
+
+    @level.setter
+    def level(self, value: int | str):
+        self._level = _level_value(value)
+        _set_level_changed()
 
     def __repr__(self):
         return f"<LoggingSystem for {self.module}>"
@@ -1576,8 +4731,20 @@ class LoggerSystem:
     def display(self):
         return self.module
 
-    def department(self, name: str) -> "LoggingDepartment":
-        return LoggingDepartment(name, self)
+    def department(
+        self, name: str, *, level: int | str | None = None
+    ) -> "LoggingDepartment":
+        return LoggingDepartment(name, self, level=level)
+
+    def flush(self):
+        "write the pending log records to the log file"
+        if self.sink:
+            self.sink.flush()
+
+    def close(self):
+        "flush and close the log file"
+        if self.sink:
+            self.sink.close()
 
     def write(
         self,
@@ -1589,13 +4756,8 @@ class LoggerSystem:
         name = str(typename)
         date = datetime.now().strftime(self.date_format)
         message = str(message)
-        if self.file:
-            if self.file.exists() and self.file.is_file():
-                content = self.file.read_text()
-            else:
-                content = ""
-            content += f"{date} reporter:{department.display} {name}: {message}\n"
-            self.file.write_text(content)
+        if self.sink:
+            self.sink.write(f"{date} reporter:{department.display} {name}: {message}\n")
 
         self.driver.stdout(
             f"{fg.cyan(date)} {fg.red("reporter:")}{fg.cyan(f"@{department.display}")}\n{self.color_type(name)}: {fg.grey(message)}\n\n"
@@ -1606,13 +4768,14 @@ class LoggerSystem:
     ):
         "write a new exception log"
         date = datetime.now().strftime(self.date_format)
-        if self.file:
-            if self.file.exists() and self.file.is_file():
-                content = self.file.read_text()
-            else:
-                content = ""
-            content += f"{date} reporter:{department.display} {type(err).__name__}: {str(err)}\n"
-            self.file.write_text(content)
+        if self.sink:
+            self.sink.write(
+                f"{date} reporter:{department.display} {type(err).__name__}: {str(err)}\n"
+            )
+            if exit:
+                self.sink.close()
+
+        from pprint import pformat
 
         *_, _tb = sys.exc_info()
         tb = _tb.tb_next if _tb else None
@@ -1679,16 +4842,44 @@ class LoggingDepartment:
     name: str
     logger: "LoggerSystem|LoggingDepartment"
 
-    def __init__(self, name: str, logger: "LoggerSystem|LoggingDepartment") -> None:
+    def __init__(
+        self,
+        name: str,
+        logger: "LoggerSystem|LoggingDepartment",
+        *,
+        level: int | str | None = None,
+    ) -> None:
         self.name = name
         self.logger = logger
+        self._level = None if level is None else _level_value(level)
+        self._cached_level = (-1, 0)
 
     def __repr__(self) -> str:
         return f"<LoggingDepartment for {self.logger.display}:{self.name}>"
 
-    def department(self, name: str) -> "LoggingDepartment":
+    def department(
+        self, name: str, *, level: int | str | None = None
+    ) -> "LoggingDepartment":
         "create a new sub-department"
-        return LoggingDepartment(name, self)
+        return LoggingDepartment(name, self, level=level)
+
+    @property
+    def level(self) -> int:
+        "the level of this department, inherited from its parent when not set"
+        generation, level = self._cached_level
+        if generation != _level_generation:
+            level = self.logger.level if self._level is None else self._level
+            self._cached_level = (_level_generation, level)
+        return level
+
+    @level.setter
+    def level(self, value: int | str | None):
+        self._level = None if value is None else _level_value(value)
+        _set_level_changed()
+
+    def enabled(self, level: int | str) -> bool:
+        "whether a record of this level would be written"
+        return _level_value(level) >= self.level
 
     def write(
         self,
@@ -1710,25 +4901,30 @@ class LoggingDepartment:
         "the display address of this department"
         return f"{self.logger.display}:{self.name}"
 
-    def error(self, message: SupportsStr):
+    def _log(self, typename: str, message, args: tuple):
+        # the level check runs before the message or any markup is built
+        if LOG_LEVELS[typename] >= self.level:
+            self.logger.write(self, typename, _log_message(message, args))
+
+    def error(self, message: SupportsStr | Callable[[], SupportsStr], *args):
         "a error logging message"
-        self.logger.write(self, "error", message)
+        self._log("error", message, args)
 
-    def warning(self, message: SupportsStr):
+    def warning(self, message: SupportsStr | Callable[[], SupportsStr], *args):
         "a warning logging message"
-        self.logger.write(self, "warning", message)
+        self._log("warning", message, args)
 
-    def info(self, message: SupportsStr):
+    def info(self, message: SupportsStr | Callable[[], SupportsStr], *args):
         "a info logging message"
-        self.logger.write(self, "info", message)
+        self._log("info", message, args)
 
-    def debug(self, message: SupportsStr):
+    def debug(self, message: SupportsStr | Callable[[], SupportsStr], *args):
         "a debug logging message"
-        self.logger.write(self, "debug", message)
+        self._log("debug", message, args)
 
-    def fatal(self, message: SupportsStr):
+    def fatal(self, message: SupportsStr | Callable[[], SupportsStr], *args):
         "a fatal logging message"
-        self.logger.write(self, "fatal", message)
+        self._log("fatal", message, args)
 
     @contextmanager
     def wrap(self, raise_error: bool = False, exit: bool = False):
@@ -1741,11 +4937,25 @@ class LoggingDepartment:
                 raise
 
 
+_print_driver = TerminalDriver()
+atexit.register(_print_driver.flush)
+
+
+def set_print_policy(policy: FlushPolicy):
+    "choose when the output of `print` is flushed to the terminal"
+    _print_driver.flush()
+    _print_driver.policy = policy
+
+
 def print(
-    *values: SupportsStr, sep: Optional[str] = " ", end: Optional[str] = "\n"
+    *values: SupportsStr,
+    sep: Optional[str] = " ",
+    end: Optional[str] = "\n",
+    flush: bool = False,
 ) -> None:
-    driver = TerminalDriver()
-    driver.stdout(((sep or "").join(map(str, values))) + (end or ""))
+    _print_driver.stdout(((sep or "").join(map(str, values))) + (end or ""))
+    if flush:
+        _print_driver.flush()
 
 
 def view(content: SupportsStr) -> str:
@@ -0,0 +1,338 @@
+"""
+benchmark suite for the `neon` rendering primitives
+
+runs without a terminal, reports operations per second and the peak
+memory allocated by a single operation, and can store the results as
+json to compare two runs and fail on regressions.
+
+    python neonbench.py --output before.json
+    python neonbench.py --compare before.json --threshold 0.1
+
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+import argparse
+import json
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import neon
+
+type Params = dict[str, int]
+type Operation = Callable[[], object]
+
+
+@dataclass
+class Benchmark:
+    "a named operation measured over a grid of parameters"
+
+    name: str
+    setup: Callable[..., Operation]
+    params: list[Params] = field(default_factory=list)
+
+    def id(self, params: Params) -> str:
+        "unique name of one parameter combination"
+        return self.name + "".join(f"[{key}={value}]" for key, value in params.items())
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(name: str, *params: Params):
+    "register a setup function, it receives the parameters and returns the operation to time"
+
+    def decorator(setup: Callable[..., Operation]):
+        BENCHMARKS.append(Benchmark(name, setup, list(params)))
+        return setup
+
+    return decorator
+
+
+def text(lines: int, columns: int, escapes: int = 0, *, seed: int = 0) -> str:
+    "deterministic text where `escapes` percent of the words are styled"
+    rng = random.Random(seed)
+    words = ["neon", "render", "cell", "width", "glyph", "table", "frame", "x"]
+    result = []
+    for _ in range(lines):
+        line = ""
+        while len(neon.remove_effects(line)) < columns:
+            word = rng.choice(words) + " "
+            if rng.randrange(100) < escapes:
+                word = f"\x1b[3{rng.randrange(1, 8)}m{word}\x1b[0m"
+            line += word
+        result.append(line)
+    return "\n".join(result)
+
+
+@benchmark(
+    "border",
+    {"lines": 10, "columns": 40, "escapes": 0},
+    {"lines": 100, "columns": 80, "escapes": 0},
+    {"lines": 100, "columns": 80, "escapes": 50},
+)
+def _border(lines: int, columns: int, escapes: int) -> Operation:
+    content = text(lines, columns, escapes)
+    return lambda: neon.border(content)
+
+
+@benchmark(
+    "measurement",
+    {"lines": 100, "columns": 80, "escapes": 0},
+    {"lines": 100, "columns": 80, "escapes": 50},
+    {"lines": 1000, "columns": 120, "escapes": 50},
+)
+def _measurement(lines: int, columns: int, escapes: int) -> Operation:
+    # unique strings so every call misses the width cache
+    contents = [
+        text(lines, columns, escapes, seed=seed) + str(seed) for seed in range(8)
+    ]
+    state = {"index": 0}
+
+    def operation():
+        state["index"] += 1
+        content = contents[state["index"] % 8] + str(state["index"])
+        return neon.Measurement(content).visible
+
+    return operation
+
+
+@benchmark(
+    "table",
+    {"rows": 100, "columns": 4},
+    {"rows": 1000, "columns": 8},
+)
+def _table(rows: int, columns: int) -> Operation:
+    table = neon.Table(*(f"column {index}" for index in range(columns)))
+    for row in range(rows):
+        table.add_row(*(f"cell {row}:{column}" for column in range(columns)))
+    return lambda: str(table)
+
+
+@benchmark(
+    "table.add_row",
+    {"columns": 4},
+    {"columns": 16},
+)
+def _table_add_row(columns: int) -> Operation:
+    table = neon.Table(*(f"column {index}" for index in range(columns)))
+    row = [f"\x1b[1mcell {column}\x1b[0m" for column in range(columns)]
+    return lambda: table.add_row(*row)
+
+
+@benchmark(
+    "canvas.project",
+    {"width": 80, "height": 24, "escapes": 0},
+    {"width": 200, "height": 60, "escapes": 0},
+    {"width": 200, "height": 60, "escapes": 50},
+)
+def _canvas_project(width: int, height: int, escapes: int) -> Operation:
+    canvas = neon.Canvas(width, height)
+    content = text(height + 2, width + 10, escapes)
+    return lambda: canvas.project(content, x=-1, y=-1)
+
+
+@benchmark(
+    "canvas.render",
+    {"width": 80, "height": 24},
+    {"width": 300, "height": 100},
+)
+def _canvas_render(width: int, height: int) -> Operation:
+    canvas = neon.Canvas(width, height)
+    canvas.project(text(height, width, 30))
+    return lambda: str(canvas.render())
+
+
+@benchmark(
+    "syntax",
+    {"lines": 20, "cached": 1},
+    {"lines": 20, "cached": 0},
+    {"lines": 200, "cached": 0},
+)
+def _syntax(lines: int, cached: int) -> Operation:
+    code = "\n".join(
+        f"value_{index} = compute({index}, 'text') + {index}" for index in range(lines)
+    )
+    syntax = neon.Syntax(code, "python")
+
+    def operation():
+        if not cached:
+            neon._highlight.cache_clear()
+        return str(syntax)
+
+    return operation
+
+
+@benchmark(
+    "diff.draw",
+    {"width": 80, "height": 24, "changed": 1},
+    {"width": 200, "height": 60, "changed": 10},
+)
+def _diff_draw(width: int, height: int, changed: int) -> Operation:
+    # drawn into a virtual terminal, its emulation is part of the timing
+    terminal = neon.VirtualTerminal(width, height + 1)
+    renderer = neon.DiffRenderer(neon.TerminalDriver(stdout=terminal))
+    frames = [text(height, width - 10, 30, seed=seed).splitlines() for seed in range(2)]
+    state = {"frame": 0}
+
+    def operation():
+        state["frame"] += 1
+        lines = list(frames[0])
+        for row in range(changed):
+            lines[row] = frames[state["frame"] % 2][row]
+        renderer.draw("\n".join(lines))
+
+    return operation
+
+
+def measure(operation: Operation, *, min_time: float) -> dict[str, float]:
+    "time an operation, returns the best ops/sec of a few rounds and the peak allocation of one call"
+    operation()  # warm up caches and lazy imports
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 5:
+            break
+        number *= 2
+    best = elapsed
+    for _ in range(4):
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    operation()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return {"ops_per_sec": number / best, "alloc_peak_bytes": peak}
+
+
+def import_time() -> float:
+    "milliseconds spent in `import neon`, measured with `-X importtime` in a fresh interpreter"
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import neon"],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in reversed(process.stderr.splitlines()):
+        match = re.match(r"import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*neon$", line)
+        if match:
+            return int(match.group(1)) / 1000
+    raise RuntimeError("neon was not found in the -X importtime output")
+
+
+def run(pattern: str | None, *, min_time: float) -> dict[str, dict[str, Any]]:
+    results: dict[str, dict[str, Any]] = {}
+    for bench in BENCHMARKS:
+        for params in bench.params or [{}]:
+            name = bench.id(params)
+            if pattern and not re.search(pattern, name):
+                continue
+            results[name] = {
+                "params": params,
+                **measure(bench.setup(**params), min_time=min_time),
+            }
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    threshold: float,
+) -> list[str]:
+    "the benchmarks that got slower than the baseline by more than `threshold`"
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["ops_per_sec"] / baseline[name]["ops_per_sec"]
+        result["baseline_ops_per_sec"] = baseline[name]["ops_per_sec"]
+        result["change"] = ratio - 1
+        if ratio < 1 - threshold:
+            regressions.append(name)
+    return regressions
+
+
+def report(results: dict[str, dict[str, Any]]) -> str:
+    table = neon.Table("benchmark", "ops/sec", "peak alloc", "change")
+    for name, result in results.items():
+        change = result.get("change")
+        table.add_row(
+            name,
+            f"{result['ops_per_sec']:,.1f}",
+            f"{result['alloc_peak_bytes']:,} B",
+            "" if change is None else f"{change:+.1%}",
+        )
+    return str(table)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "-k", "--filter", help="only run benchmarks matching this regex"
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, help="write the results to a json file"
+    )
+    parser.add_argument(
+        "-c", "--compare", type=Path, help="json results of a previous run"
+    )
+    parser.add_argument(
+        "-t", "--threshold", type=float, default=0.1,
+        help="fail when ops/sec drop by more than this fraction (default 0.1)",
+    )  # fmt: skip
+    parser.add_argument(
+        "--min-time", type=float, default=0.5, help="seconds per benchmark"
+    )
+    parser.add_argument(
+        "--import-budget", type=float, help="fail when `import neon` takes longer (ms)"
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, min_time=args.min_time)
+    failed = False
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for name in regressions:
+            neon.print(f"regression: {name} ({results[name]['change']:+.1%})")
+        failed = bool(regressions)
+    neon.print(report(results))
+
+    imported = import_time()
+    neon.print(f"import neon: {imported:.1f} ms")
+    if args.import_budget is not None and imported > args.import_budget:
+        neon.print(f"import time over budget ({args.import_budget:.1f} ms)")
+        failed = True
+
+    if args.output:
+        document = {
+            "meta": {
+                "date": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "import_ms": imported,
+            },
+            "results": results,
+        }
+        args.output.write_text(json.dumps(document, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+`import neon` has to stay cheap, the heavy dependencies are imported on
+first use (see `Syntax`, `pixelimage` and `LoggerSystem.exception`).
+
+the budget is in milliseconds and can be changed with the
+`NEON_IMPORT_BUDGET_MS` environment variable on slow machines.
+"""
+
+from pathlib import Path
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_MS = float(os.environ.get("NEON_IMPORT_BUDGET_MS", 150))
+LAZY_MODULES = ("pygments", "PIL", "pprint", "textwrap")
+
+
+def python(*arguments: str) -> subprocess.CompletedProcess:
+    "run a fresh interpreter in the repository"
+    return subprocess.run(
+        [sys.executable, *arguments],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_import_time_budget(self):
+        process = python("-X", "importtime", "-c", "import neon")
+        times = re.findall(
+            r"^import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*neon$",
+            process.stderr,
+            re.MULTILINE,
+        )
+        self.assertTrue(times, "neon was not found in the -X importtime output")
+        self.assertLessEqual(int(times[-1]) / 1000, BUDGET_MS)
+
+    def test_heavy_modules_are_lazy(self):
+        process = python(
+            "-c",
+            "import sys, neon\n"
+            f"print(*[name for name in {LAZY_MODULES!r} if name in sys.modules])",
+        )
+        self.assertEqual(process.stdout.split(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
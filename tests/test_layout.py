@@ -0,0 +1,61 @@
+"""
+a box keeps its last layout until it, a child or the requested size
+changes, and a layout pass measures every leaf once.
+"""
+
+from pathlib import Path
+from unittest import mock
+import sys
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import neon  # noqa: E402
+
+
+class LayoutCacheTest(unittest.TestCase):
+    def test_attribute_changes(self):
+        panel = neon.Panel("some longer text", title="one")
+        self.assertIn(" one ", panel.render(40))
+        panel.title = "two"
+        self.assertIn(" two ", panel.render(40))
+        before = panel.render(40)
+        panel.padding = (1, 0, 0, 1)
+        self.assertNotEqual(panel.render(40), before)
+
+    def test_child_attribute_changes(self):
+        columns = neon.Columns("a", "b")
+        panel = neon.Panel(columns)
+        before = panel.render(12)
+        columns.widths = [3, "1fr"]
+        self.assertNotEqual(panel.render(12), before)
+
+    def test_unchanged_is_cached(self):
+        panel = neon.Panel("text")
+        panel.render(20)
+        with mock.patch.object(neon.Panel, "draw") as draw:
+            panel.render(20)
+        draw.assert_not_called()
+
+
+class MeasureOnceTest(unittest.TestCase):
+    def count(self, box: neon.Box) -> int:
+        with mock.patch.object(
+            neon._Leaf, "measure", autospec=True, side_effect=neon._Leaf.measure
+        ) as measure:
+            box.render(80)
+        return measure.call_count
+
+    def test_rows(self):
+        self.assertEqual(self.count(neon.Rows("ab", "cdef")), 2)
+
+    def test_panel(self):
+        self.assertEqual(self.count(neon.Panel(neon.Rows("a", "bb"))), 2)
+
+    def test_columns(self):
+        columns = neon.Columns("a", neon.Rows("b", "c"), widths=["auto", "auto"])
+        self.assertEqual(self.count(neon.Panel(columns)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+appending to a `Syntax` re-lexes only the last lines, the result has to be
+the same as highlighting the whole code at once.
+"""
+
+from pathlib import Path
+import sys
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import neon  # noqa: E402
+
+try:
+    import pygments  # noqa: F401
+except ImportError:
+    pygments = None
+
+PYTHON = '''\
+import os
+
+
+def f(x):
+    """
+    a docstring
+    over several lines
+    """
+    return x + 1  # comment
+
+
+class A:
+    value = \'\'\'
+    text\'\'\'
+    name = "a" \\
+        "b"
+'''
+
+
+@unittest.skipIf(pygments is None, "pygments is not installed")
+class AppendTest(unittest.TestCase):
+    def check(self, code: str, lexer: str, parts: list[str]) -> neon.Syntax:
+        syntax = neon.Syntax("", lexer)
+        appended = ""
+        for part in parts:
+            syntax.append(part)
+            appended += part
+            self.assertEqual(
+                syntax.highlighted, neon.Syntax.highlight(appended, lexer), appended
+            )
+        self.assertEqual(appended, code)
+        return syntax
+
+    def test_lines(self):
+        syntax = self.check(PYTHON, "python", PYTHON.splitlines(keepends=True))
+        # the lines before the class were not lexed again
+        self.assertGreater(len(syntax._stable_output), 0)
+
+    def test_chunks(self):
+        for size in (1, 3, 7, 16):
+            parts = [PYTHON[i : i + size] for i in range(0, len(PYTHON), size)]
+            self.check(PYTHON, "python", parts)
+
+    def test_other_lexers(self):
+        for lexer, code in (
+            ("javascript", "/* a\n comment */\nlet x = `a\n${b}`;\n// c\n"),
+            ("bash", "cat <<EOF\n$x\nEOF\necho 'a\nb'\n"),
+            ("html", "<div>\n<script>\nvar x = 1;\n</script>\n</div>\n"),
+        ):
+            with self.subTest(lexer=lexer):
+                self.check(code, lexer, code.splitlines(keepends=True))
+
+    def test_preprocessing(self):
+        syntax = neon.Syntax("\n\nx = 1\n", "python")
+        syntax.append("y=2")
+        self.assertEqual(
+            syntax.highlighted, neon.Syntax.highlight("\n\nx = 1\ny=2", "python")
+        )
+        self.assertEqual(len(syntax.highlighted.splitlines()), 2)
+
+    def test_code_replaced(self):
+        syntax = neon.Syntax("a = 1\n", "python")
+        syntax.append("b = 2\n")
+        syntax.code = "c = 3\n"
+        syntax.append("d = 4\n")
+        self.assertEqual(
+            syntax.highlighted, neon.Syntax.highlight("c = 3\nd = 4\n", "python")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
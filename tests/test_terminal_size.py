@@ -0,0 +1,52 @@
+"""
+the terminal size is cached while neon's SIGWINCH handler is installed,
+the handler can only be installed from the main thread.
+"""
+
+import signal
+import threading
+import unittest
+
+import neon
+
+
+@unittest.skipUnless(hasattr(signal, "SIGWINCH"), "needs SIGWINCH")
+class ResizeWatchTest(unittest.TestCase):
+    def setUp(self):
+        self.previous = signal.getsignal(signal.SIGWINCH)
+        driver = neon.TerminalDriver
+        driver._watching_resize = None
+        driver._resize_handler = None
+        driver._size = None
+
+    def tearDown(self):
+        signal.signal(signal.SIGWINCH, self.previous)
+        neon.TerminalDriver._watching_resize = None
+        neon.TerminalDriver._resize_handler = None
+        neon.TerminalDriver._size = None
+
+    def test_thread_access_first(self):
+        driver = neon.TerminalDriver()
+        thread = threading.Thread(target=lambda: driver.size)
+        thread.start()
+        thread.join()
+        self.assertIsNone(neon.TerminalDriver._watching_resize)
+
+        driver.size
+        self.assertTrue(neon.TerminalDriver._watching_resize)
+        self.assertIs(
+            signal.getsignal(signal.SIGWINCH), neon.TerminalDriver._resize_handler
+        )
+        self.assertIsNotNone(neon.TerminalDriver._size)
+
+    def test_replaced_handler(self):
+        driver = neon.TerminalDriver()
+        driver.size
+        signal.signal(signal.SIGWINCH, signal.SIG_DFL)
+        neon.TerminalDriver._size = None
+        driver.size
+        self.assertIsNone(neon.TerminalDriver._size)
+
+
+if __name__ == "__main__":
+    unittest.main()
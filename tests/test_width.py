@@ -0,0 +1,78 @@
+"""
+the text helpers cut by terminal column, wide glyphs (CJK, emoji) take two
+columns and are never split, so no result is wider than requested.
+"""
+
+from pathlib import Path
+import sys
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from neon import (  # noqa: E402
+    StyledText,
+    breaklines,
+    constrain,
+    crop,
+    cut,
+    fg,
+    strwidth,
+    truncate,
+)
+
+CJK = "中文中文ab"
+EMOJI = "😀😀x😀"
+
+
+def width(string: str) -> int:
+    "the widest line of a string, escape codes not counted"
+    return max((strwidth(line.plain) for line in StyledText(string).lines()), default=0)
+
+
+class WidthTest(unittest.TestCase):
+    def test_constrain(self):
+        self.assertEqual(constrain(CJK, 4), "中文")
+        self.assertEqual(constrain(CJK, 5), "中文")
+        self.assertEqual(constrain(CJK, 5, reverse=True), "文ab")
+        self.assertEqual(constrain(EMOJI, 3), "😀")
+        self.assertEqual(StyledText(constrain(fg.red(CJK), 4)).plain, "中文")
+        for size in range(11):
+            self.assertLessEqual(width(constrain(fg.red(CJK), size)), size)
+
+    def test_crop(self):
+        self.assertEqual(crop(f"{CJK}\n{EMOJI}", (3, 2)), "中\n😀\n")
+        for size in range(11):
+            self.assertLessEqual(width(crop(fg.red(CJK), (size, 1))), size)
+
+    def test_breaklines(self):
+        self.assertEqual(breaklines(CJK, 4), "中文\n中文\nab")
+        self.assertEqual(breaklines(EMOJI, 3), "😀\n😀x\n😀")
+        for size in range(2, 11):
+            for string in (CJK, fg.red(CJK), f"{CJK} {EMOJI}"):
+                self.assertLessEqual(width(breaklines(string, size)), size)
+
+    def test_truncate(self):
+        self.assertEqual(truncate(CJK, 6), "中...")
+        self.assertEqual(truncate(EMOJI, 6), "😀...")
+        self.assertEqual(truncate(CJK, 10), CJK)
+        for size in range(11):
+            self.assertLessEqual(width(truncate(fg.red(CJK), size)), size)
+
+    def test_cut(self):
+        start, middle, end = cut(CJK, (1, 5))
+        self.assertEqual((str(start), str(middle), str(end)), ("", "文", "文ab"))
+
+    def test_styled_text(self):
+        text = StyledText(fg.red("中文") + EMOJI)
+        self.assertEqual(len(text), 11)
+        self.assertEqual(text[2:6].plain, "文😀")
+        self.assertEqual(text[1:3].plain, "")
+        self.assertEqual(text.truncate(5).plain, "中...")
+        self.assertEqual(
+            [line.plain for line in text.wrap(3)], ["中", "文", "😀", "😀x", "😀"]
+        )
+        self.assertEqual(StyledText("é中")[:1].plain, "é")
+
+
+if __name__ == "__main__":
+    unittest.main()